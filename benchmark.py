@@ -0,0 +1,53 @@
+import asyncio
+import random
+import sys
+
+from s2clientprotocol import sc2api_pb2 as sc_pb
+
+from sc2 import Race
+
+from modubot.headless import replay
+from modubot.profiler import StepProfiler
+from modubot.recording import load_recording
+from protoss_greedy import build as build_protoss
+from zerg_experimental import build as build_zerg
+
+# Replays a recorded game (see RECORD_DIR in modubot/bot.py) into a freshly built bot, with no game running,
+# and reports steps per second along with where the step time went.
+#
+#   python benchmark.py <recording> [runs]
+
+builds = {
+  Race.Protoss: build_protoss,
+  Race.Zerg: build_zerg,
+}
+
+def recorded_race(recording):
+  game_info = sc_pb.ResponseGameInfo.FromString(recording.frames[0].game_info)
+  player = next(p for p in game_info.player_info if p.player_id == recording.player_id)
+  return Race(player.race_actual or player.race_requested)
+
+def print_timings(profiler):
+  print(f"{'section':<40} {'samples':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9} {'total ms':>10}")
+  for timing in profiler.summaries():
+    wall = timing["wall"]
+    print(f"{timing['category'] + ':' + timing['name']:<40} {timing['samples']:>8} "
+      f"{wall['p50_ms']:>9} {wall['p90_ms']:>9} {wall['p99_ms']:>9} {wall['max_ms']:>9} {wall['total_ms']:>10}")
+
+def main():
+  recording = load_recording(sys.argv[1])
+  runs = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+  build = builds[recorded_race(recording)]
+  print(f"{len(recording.frames)} frames recorded for player {recording.player_id}")
+
+  for run in range(runs):
+    random.seed(run)
+    bot = build()
+    bot.profiler = StepProfiler(report_every=None)
+    (steps, elapsed) = asyncio.get_event_loop().run_until_complete(replay(bot, recording))
+    print(f"run {run + 1}: {steps} steps in {elapsed:.2f}s ({steps / max(elapsed, 1e-9):.1f} steps/sec)")
+
+  print_timings(bot.profiler)
+
+if __name__ == '__main__':
+  main()
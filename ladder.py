@@ -0,0 +1,120 @@
+import argparse
+import collections
+import concurrent.futures
+import itertools
+import json
+import multiprocessing
+import os
+import time
+import traceback
+
+import sc2
+from sc2 import Race, Difficulty
+from sc2.player import Bot, Computer
+from sc2.data import AIBuild
+
+from maps import all_maps
+from modubot.profiler import StepProfiler
+from protoss_greedy import build as build_protoss
+from zerg_experimental import build as build_zerg
+
+# Plays many games against the built-in AI at once, one game per worker process,
+# and writes what happened in each to a summary file (one JSON object per line, written as games finish).
+#
+#   python -O ladder.py [--maps ...] [--races protoss zerg] [--enemies terran zerg protoss]
+#                       [--difficulties CheatMoney ...] [--builds RandomBuild ...] [--repeat N]
+#                       [--workers N] [--time-limit SECONDS] [--output FILE]
+#
+# Every combination of map, race, enemy race, difficulty and build is played `repeat` times.
+# Each game gets a freshly built bot, so nothing carries over from one game to the next.
+
+builds = {
+  Race.Protoss: build_protoss,
+  Race.Zerg: build_zerg,
+}
+
+def parse_race(name):
+  return Race[name.capitalize()]
+
+def describe(game):
+  (map_name, race, enemy_race, difficulty, ai_build) = game
+  return {
+    "map": map_name,
+    "race": race.name,
+    "enemy_race": enemy_race.name,
+    "difficulty": difficulty.name,
+    "build": ai_build.name,
+  }
+
+def play(game, time_limit=None):
+  (map_name, race, enemy_race, difficulty, ai_build) = game
+  record = describe(game)
+  bot = builds[race]()
+  # keep every sample for the summary instead of logging them as the game goes
+  bot.profiler = StepProfiler(report_every=None)
+  start = time.perf_counter()
+  try:
+    result = sc2.run_game(sc2.maps.get(map_name), [
+      Bot(race, bot),
+      Computer(enemy_race, difficulty, ai_build)
+    ], realtime=False, game_time_limit=time_limit)
+    record["result"] = result.name if result else None
+  except Exception:
+    record["result"] = None
+    record["error"] = traceback.format_exc()
+
+  record["wall_seconds"] = round(time.perf_counter() - start, 1)
+  record["game_seconds"] = round(bot.state.game_loop / 22.4, 1) if getattr(bot, 'state', None) else 0
+  record["timing"] = list(bot.profiler.summaries())
+  return record
+
+def print_results(records):
+  matchups = collections.defaultdict(list)
+  for record in records:
+    matchups[(record["race"], record["enemy_race"], record["difficulty"])].append(record)
+
+  print(f"{'race':<10} {'enemy':<10} {'difficulty':<14} {'games':>6} {'wins':>6} {'errors':>7} {'avg min':>8}")
+  for ((race, enemy_race, difficulty), games) in sorted(matchups.items()):
+    wins = sum(1 for g in games if g["result"] == "Victory")
+    errors = sum(1 for g in games if "error" in g)
+    minutes = sum(g["game_seconds"] for g in games) / len(games) / 60
+    print(f"{race:<10} {enemy_race:<10} {difficulty:<14} {len(games):>6} {wins:>6} {errors:>7} {minutes:>8.1f}")
+
+def main():
+  parser = argparse.ArgumentParser(description="Play the bots against the built-in AI in parallel.")
+  parser.add_argument("--maps", nargs="+", default=all_maps)
+  parser.add_argument("--races", nargs="+", type=parse_race, default=list(builds.keys()))
+  parser.add_argument("--enemies", nargs="+", type=parse_race, default=[ Race.Terran, Race.Zerg, Race.Protoss ])
+  parser.add_argument("--difficulties", nargs="+", type=lambda d: Difficulty[d], default=[ Difficulty.CheatMoney ])
+  parser.add_argument("--builds", nargs="+", type=lambda b: AIBuild[b], default=[ AIBuild.RandomBuild ])
+  parser.add_argument("--repeat", type=int, default=1)
+  parser.add_argument("--workers", type=int, default=os.cpu_count())
+  parser.add_argument("--time-limit", type=int, default=None, help="end games after this many game seconds")
+  parser.add_argument("--output", default=f"logs/ladder-{int(time.time())}.jsonl")
+  args = parser.parse_args()
+
+  games = list(itertools.product(args.maps, args.races, args.enemies, args.difficulties, args.builds)) * args.repeat
+  print(f"Playing {len(games)} games on {args.workers} workers, writing results to {args.output}")
+
+  # Each worker starts fresh rather than forking this process, so it gets its own log writer thread and event loop.
+  records = []
+  context = multiprocessing.get_context("spawn")
+  with open(args.output, 'a', encoding='utf-8') as output, \
+       concurrent.futures.ProcessPoolExecutor(args.workers, mp_context=context) as pool:
+    futures = { pool.submit(play, game, args.time_limit): game for game in games }
+    for future in concurrent.futures.as_completed(futures):
+      try:
+        record = future.result()
+      except BaseException as e:
+        # the worker itself went down (python-sc2 exits the process when it can't find the game, for one)
+        record = { **describe(futures[future]), "result": None, "error": repr(e), "wall_seconds": 0, "game_seconds": 0, "timing": [] }
+      records.append(record)
+      output.write(json.dumps(record) + '\n')
+      output.flush()
+      print(f"[{len(records)}/{len(games)}] {record['race']} vs {record['enemy_race']} {record['difficulty']} {record['build']} on {record['map']}: "
+        f"{record['result'] or 'error'} after {record['game_seconds']}s")
+
+  print_results(records)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,22 @@
+# Available abilities per unit, valid for the current step only.
+# The game state does not change during a step, so one answer per unit is enough,
+# and asking about many units at once costs a single round trip to the client.
+class AbilityCache():
+  def __init__(self, bot):
+    self.bot = bot
+    self.abilities = dict()   # tag -> set of AbilityId
+
+  async def prefetch(self, units):
+    missing = { u.tag: u for u in units if u.tag not in self.abilities }
+    if not missing:
+      return
+
+    with self.bot.profiler.measure("abilities", "query"):
+      result = await self.bot._client.query_available_abilities_with_tag(list(missing.values()))
+    for tag in missing:
+      self.abilities[tag] = result.get(tag, set())
+
+  async def get(self, unit):
+    if unit.tag not in self.abilities:
+      await self.prefetch([ unit ])
+    return self.abilities[unit.tag]
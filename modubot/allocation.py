@@ -0,0 +1,63 @@
+from modubot.common import Urgency
+
+# Single source of truth for which units are claimed, by whom, and how urgently.
+#
+# An owner is usually a BotModule, but may be any object with a `deallocate(tag_set)` method.
+# That method is called only on the owner that actually lost units to a more urgent claim,
+# so other owners never have to hear about it.
+class AllocationRegistry():
+  def __init__(self):
+    self.owners = dict()   # tag -> (owner, urgency)
+    self.claims = dict()   # owner -> set of tags
+
+  def claimed_by(self, owner):
+    # the live set; callers should change it only through claim/release
+    return self.claims.setdefault(owner, set())
+
+  def owner_of(self, tag):
+    claim = self.owners.get(tag)
+    return claim[0] if claim else None
+
+  def claim(self, owner, tags, urgency):
+    claimed = self.claimed_by(owner)
+    taken = dict()
+    for tag in list(tags):
+      previous = self.owners.get(tag)
+      if previous and previous[0] is not owner:
+        self.claims[previous[0]].discard(tag)
+        taken.setdefault(previous[0], set()).add(tag)
+      self.owners[tag] = (owner, urgency)
+      claimed.add(tag)
+
+    for (previous_owner, tag_set) in taken.items():
+      previous_owner.deallocate(tag_set)
+
+  def release(self, owner, tags):
+    claimed = self.claimed_by(owner)
+    for tag in list(tags):
+      claim = self.owners.get(tag)
+      if claim and claim[0] is owner:
+        del self.owners[tag]
+      claimed.discard(tag)
+
+  def revoke(self, tags):
+    # take units away from whoever holds them
+    taken = dict()
+    for tag in tags:
+      claim = self.owners.pop(tag, None)
+      if claim:
+        self.claims[claim[0]].discard(tag)
+        taken.setdefault(claim[0], set()).add(tag)
+
+    for (owner, tag_set) in taken.items():
+      owner.deallocate(tag_set)
+
+  def forget(self, tag):
+    # the unit is gone; nobody needs to be told
+    claim = self.owners.pop(tag, None)
+    if claim:
+      self.claims[claim[0]].discard(tag)
+
+  def unallocated(self, units, urgency=Urgency.NONE):
+    owners = self.owners
+    return units.filter(lambda u: u.tag not in owners or owners[u.tag][1] < urgency)
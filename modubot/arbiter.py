@@ -0,0 +1,164 @@
+import heapq
+import itertools
+
+from sc2.constants import UnitTypeId
+
+RESOURCES = [ 'mineral', 'vespene', 'supply' ]
+
+class RequestQueue():
+  # most urgent first; requests of equal urgency come out in the order they went in
+  def __init__(self, requests=[]):
+    self.counter = itertools.count()
+    self.heap = [ (-request.urgency, next(self.counter), request) for request in requests ]
+    heapq.heapify(self.heap)
+
+  def __len__(self):
+    return len(self.heap)
+
+  def push(self, request):
+    heapq.heappush(self.heap, (-request.urgency, next(self.counter), request))
+
+  def pop(self):
+    return heapq.heappop(self.heap)[2]
+
+  def drain(self):
+    remaining = []
+    while self.heap:
+      remaining.append(self.pop())
+    return remaining
+
+class CostTable():
+  # costs don't change during a game, so each expense is only looked up once
+  def __init__(self, bot):
+    self.bot = bot
+    self.costs = dict()
+
+  def __getitem__(self, expense):
+    if expense not in self.costs:
+      cost = self.bot.calculate_cost(expense)
+      supply_cost = self.bot.calculate_supply_cost(expense) if isinstance(expense, UnitTypeId) else 0
+      self.costs[expense] = (cost.minerals, cost.vespene, supply_cost)
+    return self.costs[expense]
+
+class Budget():
+  # what is left to spend this step (minerals, vespene, supply),
+  # and for each resource, the urgency a request needs in order to still get any of it
+  def __init__(self, minerals, vespene, supply):
+    self.available = [ minerals, vespene, supply ]
+    self.thresholds = [ None, None, None ]
+
+  def saturated_below(self, urgency):
+    return None not in self.thresholds and urgency < min(self.thresholds)
+
+  def blocked_by(self, urgency, cost):
+    for i in range(len(RESOURCES)):
+      if cost[i] > 0 and self.thresholds[i] and urgency < self.thresholds[i]:
+        return i
+    return None
+
+  def reserve(self, urgency, cost):
+    # a request we can't afford keeps anything less urgent from taking the resources it is waiting for
+    can_afford = True
+    for i in range(len(RESOURCES)):
+      if cost[i] > 0 and cost[i] > self.available[i]:
+        can_afford = False
+        self.thresholds[i] = urgency
+    return can_afford
+
+  def deduct(self, cost):
+    for i in range(len(RESOURCES)):
+      self.available[i] -= max(cost[i], 0)
+
+# Decides which requests get filled this step.
+# Needs only a handful of bot members (calculate_cost, calculate_supply_cost, do, log, log_request_result, profiler),
+# so it can be driven by a stand-in object outside of a game.
+class RequestArbiter():
+  def __init__(self, bot):
+    self.bot = bot
+    self.costs = CostTable(bot)
+
+  async def arbitrate(self, requests, budget):
+    queue = RequestQueue(requests)
+    checked = set()
+    saturated = False
+    while queue:
+      request = queue.pop()
+      if not request.urgency:
+        break
+
+      if not saturated and budget.saturated_below(request.urgency):
+        # Every resource is spoken for by something more urgent than anything left in the queue,
+        # so anything with a cost would be turned down. Only free requests are still worth fulfilling.
+        saturated = True
+        remaining = [ request ] + queue.drain()
+        free = [ r for r in remaining if r.urgency and not any(self.costs[r.expense]) ]
+        self.bot.log.info({
+          "message": "All resources spoken for",
+          "urgency": request.urgency,
+          "skipped": len(remaining) - len(free),
+        })
+        queue = RequestQueue(free)
+        continue
+
+      await self.evaluate(request, budget, checked)
+
+  async def fulfill(self, request):
+    # follows replacement requests until one of them produces a command (or nothing)
+    bot = self.bot
+    result = await request.fulfill(bot)
+
+    while hasattr(result, 'fulfill'):
+      bot.log.debug({
+        "message": "Replacing request",
+        "requested": {
+          "request_type": type(request),
+          "expense": request.expense
+        },
+        "replacement": {
+          "request_type": type(result),
+          "expense": result.expense
+        }
+      })
+      request = result
+      result = await request.fulfill(bot)
+
+    return (request, result)
+
+  async def evaluate(self, request, budget, checked):
+    bot = self.bot
+    original_request = request
+    with bot.profiler.measure("fulfill", type(original_request).__name__):
+      (request, result) = await self.fulfill(original_request)
+
+    if request.expense in checked:
+      bot.log_request_result(request, original_request, "duplicate request")
+      return
+
+    checked.add(request.expense)
+    cost = self.costs[request.expense]
+
+    blocking_resource = budget.blocked_by(request.urgency, cost)
+    if blocking_resource is not None:
+      bot.log_request_result(request, original_request,
+        f"urgency is below {RESOURCES[blocking_resource]} threshold (costs {cost[blocking_resource]})"
+      )
+      return
+
+    can_afford = budget.reserve(request.urgency, cost)
+
+    cost_msg = 'cost not deducted'
+    if result or isinstance(request.expense, UnitTypeId):
+      cost_msg = 'real cost deducted'
+      budget.deduct(cost)
+
+    if can_afford:
+      if not result:
+        bot.log_request_result(request, original_request,
+          f"dependency already in progress ({cost_msg})"
+        )
+        return
+
+      bot.do(result)
+      bot.log_request_result(request, original_request, "️✔ Filled")
+    else:
+      bot.log_request_result(request, original_request, f"️Can't afford ({cost_msg})")
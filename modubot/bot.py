@@ -6,31 +6,64 @@ import sc2
 import sys
 import time
 
+import numpy as np
+
 from pythonjsonlogger import jsonlogger
 
+from s2clientprotocol import raw_pb2 as raw_pb
+from s2clientprotocol import sc2api_pb2 as sc_pb
+
 from sc2 import Race
+from sc2.action import combine_actions
 from sc2.constants import UnitTypeId, UpgradeId
+from sc2.data import ChatChannel
+from sc2.protocol import ProtocolError
+from sc2.unit import Unit
 from sc2.unit_command import UnitCommand
 from sc2.units import Units
 from sc2.position import Point2
 
+from modubot.abilities import AbilityCache
+from modubot.allocation import AllocationRegistry
+from modubot.combat import CombatValues
+from modubot.arbiter import Budget, RequestArbiter
+from modubot.log_writer import BackgroundFileHandler
+from modubot.map_cache import MapCache
+from modubot.pathing import GroundDistances
 from modubot.modules.game_state import SurrenderedException
 from modubot.planners.protoss import ProtossBasePlanner
 from modubot.planners.zerg import ZergBasePlanner
-from modubot.common import Urgency, list_flatten, OptionsObject, is_worker, LoggerWithFields
-
-def urgencyValue(req):
-  return req.urgency
+from modubot.profiler import StepProfiler
+from modubot.recording import ObservationRecorder
+from modubot.scheduler import ModuleScheduler
+from modubot.snapshot import UnitSnapshot
+from modubot.spatial import SpatialIndex
+from modubot.threat_map import ThreatMap
+from modubot.tech import TechTable
+from modubot.views import UnitViews
+from modubot.common import Urgency, list_flatten, OptionsObject, LoggerWithFields
 
 log_level = os.getenv("LOG_LEVEL", "warn")
 numeric_level = getattr(logging, log_level.upper(), None)
 if not isinstance(numeric_level, int):
     raise ValueError(f"Invalid log level: {log_level}")
 
-handler = logging.FileHandler(filename='logs/sc2.log',encoding='utf-8')
+handler = BackgroundFileHandler(filename='logs/sc2.log',encoding='utf-8')
 handler.setFormatter(jsonlogger.JsonFormatter())
 logging.basicConfig(level=numeric_level,handlers=[handler])
 
+# how many steps between timing reports (0 turns them off)
+profile_interval = int(os.getenv("PROFILE_INTERVAL", "100"))
+
+# where to save observation recordings for offline replay (none are made unless this is set)
+record_dir = os.getenv("RECORD_DIR")
+
+# how long a step may run before low-priority modules are put off to a later one (0 never puts them off)
+step_budget = float(os.getenv("STEP_BUDGET_MS", "40"))
+
+# where to keep map analysis between games (set it empty to analyse every map every game)
+map_cache_dir = os.getenv("MAP_CACHE_DIR", "map_cache")
+
 ### EL BOT ###
 class ModuBot(sc2.BotAI):
   def __init__(self, modules=[], limits=dict()):
@@ -45,6 +78,29 @@ class ModuBot(sc2.BotAI):
     # we'll deal with this once the game starts
     self.planner = None
 
+    # who has claimed which units
+    self.allocations = AllocationRegistry()
+
+    # how strong units are in a fight
+    self.shared.combat = CombatValues(self)
+
+    # collections that several modules need each step
+    self.shared.views = UnitViews(self)
+
+    # decides which requests get filled
+    self.arbiter = RequestArbiter(self)
+
+    # decides which modules run each step
+    self.scheduler = ModuleScheduler(step_budget)
+
+    # where the step time goes
+    self.profiler = StepProfiler(profile_interval)
+    self.recorder = None
+    self.map_cache = None
+
+    # camera moves and chat, sent along with this step's unit commands
+    self.client_actions = []
+
     # things a consumer should provide
     self.limits = limits
     self.modules = modules
@@ -53,37 +109,82 @@ class ModuBot(sc2.BotAI):
     self.start_time = str(int(time.time()))
 
   def deallocate(self, tag_set):
-    for module in self.modules:
-      module.deallocate(tag_set)
+    self.allocations.revoke(tag_set)
 
   async def on_start(self):
     bot_id = f"{self.start_time}-{self.player_id}-{self.race}"
     self.log = LoggerWithFields(logging.getLogger(), { "bot_id": bot_id, "start_time": self.start_time })
+    if record_dir:
+      self.recorder = ObservationRecorder(os.path.join(record_dir, f"{bot_id}.sc2rec"))
+      await self.recorder.start(self)
+
+    self.shared.ground_distances = GroundDistances(self.game_info, self.expansion_locations_list, self.open_map_cache())
+    self.shared.threat_map = ThreatMap(self.game_info)
+
     if self.race == Race.Protoss:
       self.planner = ProtossBasePlanner(self)
     elif self.race == Race.Zerg:
       self.planner = ZergBasePlanner(self)
 
+    if self.map_cache:
+      self.map_cache.save()
+
     for module in self.modules:
       await module.on_start()
 
+  def open_map_cache(self):
+    if self.map_cache is None and map_cache_dir:
+      self.map_cache = MapCache(self.game_info, map_cache_dir)
+    return self.map_cache
+
+  def _find_expansion_locations(self):
+    # python-sc2 works these out before the first step of every game, and it's slow on maps with many resources.
+    # The answer only depends on the map, so it's kept in the map cache.
+    map_cache = self.open_map_cache()
+    positions = map_cache.get("expansion_positions") if map_cache else None
+    if positions is None:
+      super()._find_expansion_locations()
+      if map_cache:
+        expansions = self._expansion_positions_list
+        resources = list(self._resource_location_to_expansion_position_dict.items())
+        map_cache.put("expansion_positions", np.array(expansions, dtype=float).reshape(-1, 2))
+        map_cache.put("expansion_resources", np.array([ r for (r, _) in resources ], dtype=float).reshape(-1, 2))
+        map_cache.put("expansion_of_resource", np.array([ expansions.index(e) for (_, e) in resources ], dtype=int))
+      return
+
+    self._expansion_positions_list = [ Point2(p) for p in positions.tolist() ]
+    self._resource_location_to_expansion_position_dict = {
+      Point2(r): self._expansion_positions_list[i]
+      for (r, i) in zip(map_cache.get("expansion_resources").tolist(), map_cache.get("expansion_of_resource").tolist())
+    }
+
   async def on_end(self, game_result):
     for module in self.modules:
       await module.on_end(game_result)
+    if self.recorder:
+      self.recorder.close()
+    handler.flush()
 
   async def on_unit_created(self, unit):
     for module in self.modules:
       await module.on_unit_created(unit)
 
   async def on_unit_destroyed(self, tag):
+    if self.planner:
+      self.planner.on_unit_destroyed(tag)
     for module in self.modules:
       await module.on_unit_destroyed(tag)
+    self.allocations.forget(tag)
 
   async def on_building_construction_started(self, unit):
+    if self.planner:
+      self.planner.on_building_construction_started(unit)
     for module in self.modules:
       await module.on_building_construction_started(unit)
 
   async def on_building_construction_complete(self, unit):
+    if self.planner:
+      self.planner.on_building_construction_complete(unit)
     for module in self.modules:
       await module.on_building_construction_complete(unit)
 
@@ -94,6 +195,8 @@ class ModuBot(sc2.BotAI):
       await module.on_upgrade_complete(upgrade_id)
 
   def log_request_header(self, iteration):
+    if not self.log.isEnabledFor(logging.INFO):
+      return
     self.log.info({
       "message": "Beginning iteration",
       "iteration": iteration,
@@ -103,7 +206,7 @@ class ModuBot(sc2.BotAI):
       "vespene": self.vespene,
       "supply_used": self.supply_used,
       "supply_cap": self.supply_cap,
-      "known_enemies": len(self.shared.known_enemy_units),
+      "known_enemies": len(self.shared.known_enemies),
       "allocated": dict(zip(
         [ type(m).__name__ for m in self.modules ],
         [ len(m.allocated) for m in self.modules ],
@@ -112,6 +215,8 @@ class ModuBot(sc2.BotAI):
     })
 
   def log_request_result(self, request, original_request, result_msg):
+    if not self.log.isEnabledFor(logging.INFO):
+      return
     self.log.info({
       "message": "Request evaluated",
       "urgency": request.urgency,
@@ -124,115 +229,82 @@ class ModuBot(sc2.BotAI):
     })
 
   async def on_step(self, iteration):
+    with self.profiler.measure("step", "on_step"):
+      await self.step(iteration)
+
+    if self.profiler.report_due(iteration):
+      self.profiler.report(self.log, iteration)
+
+  async def step(self, iteration):
     self.log = self.log.withFields({ "game_time": self.time })
+    self.shared.spatial = SpatialIndex(self)
+    self.shared.snapshot = UnitSnapshot(self)
+    self.shared.tech = TechTable(self)
+    self.shared.abilities = AbilityCache(self)
+    self.scheduler.start_step(self.modules, self.time)
+    due_modules = [ module for module in self.modules if self.scheduler.due(module, self.time) ]
+    await self.shared.abilities.prefetch(list_flatten([ module.ability_candidates() for module in due_modules ]))
+
     requests = []
     for module in self.modules:
+      if not self.scheduler.should_run(module, self.time):
+        requests.extend(self.scheduler.skipped(module, self.time))
+        continue
       try:
-        module_result = await module.on_step(iteration) or []
+        with self.profiler.measure("module", type(module).__name__):
+          module_result = await module.on_step(iteration) or []
+        self.scheduler.ran(module, self.time, module_result)
         requests.extend(module_result)
       except SurrenderedException:
         self.log.info("Exiting due to surrender")
         return
 
-    requests.sort(key=urgencyValue, reverse=True)
-    mineral_threshold = None
-    vespene_threshold = None
-    supply_threshold = None
-    minerals = self.minerals
-    vespene = self.vespene
-    supply = self.supply_left
-    checked = set()
+    await self.shared.abilities.prefetch(list_flatten([ request.ability_candidates(self) for request in requests if request.urgency ]))
     self.log_request_header(iteration)
-    while requests:
-      request = requests.pop(0)
-      original_request = request
-      if not request.urgency:
-        break
-
-      result = await request.fulfill(self)
-
-      while hasattr(result, 'fulfill'):
-        self.log.debug({
-          "message": "Replacing request",
-          "requested": {
-            "request_type": type(request),
-            "expense": request.expense
-          },
-          "replacement": {
-            "request_type": type(result),
-            "expense": result.expense
-          }
-        })
-        request = result
-        result = await request.fulfill(self)
-
-      if request.expense in checked:
-        self.log_request_result(request, original_request, "duplicate request")
-        continue
-
-      checked.add(request.expense)
-      cost = self.calculate_cost(request.expense)
-      supply_cost = self.calculate_supply_cost(request.expense) if isinstance(request.expense, UnitTypeId) else 0
-
-      if cost.minerals > 0 and mineral_threshold and request.urgency < mineral_threshold:
-        self.log_request_result(request, original_request, f"urgency is below mineral threshold (costs {cost.minerals})")
-        continue
-      if cost.vespene > 0 and vespene_threshold and request.urgency < vespene_threshold:
-        self.log_request_result(request, original_request, f"urgency is below vespene threshold (costs {cost.vespene})")
-        continue
-      if supply_cost > 0 and supply_threshold and request.urgency < supply_threshold:
-        self.log_request_result(request, original_request, f"urgency is below supply threshold (costs {supply_cost})")
-        continue
-
-      can_afford = True
-      if cost.minerals > 0 and cost.minerals > minerals:
-        can_afford = False
-        mineral_threshold = request.urgency
-
-      if cost.vespene > 0 and cost.vespene > vespene:
-        can_afford = False
-        vespene_threshold = request.urgency
-
-      if supply_cost > 0 and supply_cost > supply:
-        can_afford = False
-        supply_threshold = request.urgency
-
-      cost_msg = 'cost not deducted'
-      if result or isinstance(request.expense, UnitTypeId):
-        cost_msg = 'real cost deducted'
-        minerals -= max(cost.minerals, 0)
-        vespene -= max(cost.vespene, 0)
-        supply -= max(supply_cost, 0)
-
-      if can_afford:
-        if not result:
-          self.log_request_result(request, original_request,
-            f"dependency already in progress ({cost_msg})"
-          )
-          continue
-
-        self.do(result)
-        self.log_request_result(request, original_request, "️✔ Filled")
-      else:
-        self.log_request_result(request, original_request, f"️Can't afford ({cost_msg})")
-
-    handler.flush()
-    handler.close()
+    await self.arbiter.arbitrate(requests, Budget(self.minerals, self.vespene, self.supply_left))
+
+  # The game answers one request at a time, so a module that waits on the client holds up every module after it.
+  # Camera moves and chat don't need an answer, so they're queued and go out in the same request as the unit commands.
+  async def move_camera(self, position):
+    if isinstance(position, Units):
+      position = position.center
+    if isinstance(position, Unit):
+      position = position.position
+    self.client_actions.append(sc_pb.Action(
+      action_raw=raw_pb.ActionRaw(camera_move=raw_pb.ActionRawCameraMove(center_world_space=position.to3.as_Point))))
+
+  async def chat_send(self, message, team_only=False):
+    channel = ChatChannel.Team if team_only else ChatChannel.Broadcast
+    self.client_actions.append(sc_pb.Action(action_chat=sc_pb.ActionChat(channel=channel.value, message=message)))
+
+  async def _do_actions(self, actions, prevent_double=True):
+    if prevent_double:
+      actions = list(filter(self.prevent_double_actions, actions))
+    queued, self.client_actions = self.client_actions, []
+    if not actions and not queued:
+      return None
+    try:
+      await self._client._execute(action=sc_pb.RequestAction(
+        actions=queued + [ sc_pb.Action(action_raw=a) for a in combine_actions(actions) ]))
+    except ProtocolError:
+      return None
+
+  async def _after_step(self):
+    # python-sc2 only sends actions when there are unit commands
+    if self.client_actions and not self.actions:
+      await self._do_actions([])
+    return await super()._after_step()
 
   def bases_centroid(self):
     return Point2.center([base.position for base in self.townhalls])
 
   # Modules that want to claim units are required to:
   # - Implement an `urgency` property
-  # - report a set of tags of allocated units
-  # - respond to requests to deallocate units
-  # In exchange for meeting these requirements, a module may add units freely to its allocated set,
+  # - claim and release units through the allocation registry (BotModule.claim / BotModule.release)
+  # - respond to having units taken away (`deallocate`), if they keep any state beyond the tags
+  # In exchange for meeting these requirements, a module may claim units freely,
   # provided that another module has not claimed them at a higher urgency.
 
   def unallocated(self, unit_types=None, urgency=Urgency.NONE):
-    units = self.units.ready(unit_types) if unit_types else self.units.ready.filter(lambda u: not is_worker(u))
-    return units.tags_not_in(list_flatten([
-      list(module.allocated) if module.urgency >= urgency
-      else []
-      for module in self.modules
-    ]))
+    units = self.units.ready(unit_types) if unit_types else self.shared.views.ready_army
+    return self.allocations.unallocated(units, urgency)
@@ -0,0 +1,54 @@
+import numpy as np
+
+# How strong units are in a fight, shared through `bot.shared.combat`.
+#
+# A unit's strength is its ground dps times its health and shields, doubled for massive units.
+# Dps and massiveness only depend on the unit type, so they are worked out once per type for the whole game.
+# Strength depends on health, so it is worked out at most once per unit per step.
+# Our whole army's strength comes straight from the step's snapshot columns.
+# Enemy strength is totalled by EnemyMemory as units are seen, so comparing whole armies doesn't need to visit any units.
+class CombatValues():
+  def __init__(self, bot):
+    self.bot = bot
+    self.type_factors = dict()   # type id -> ground dps, doubled if massive
+    self.strengths = dict()      # tag -> strength, this step
+    self.game_loop = None
+    self._army_strength = None
+
+  def refresh(self):
+    if self.game_loop != self.bot.state.game_loop:
+      self.game_loop = self.bot.state.game_loop
+      self.strengths = dict()
+      self._army_strength = None
+
+  def factor(self, unit):
+    factor = self.type_factors.get(unit.type_id)
+    if factor is None:
+      factor = self.type_factors[unit.type_id] = unit.ground_dps * (2 if unit.is_massive else 1)
+    return factor
+
+  def strength(self, unit):
+    self.refresh()
+    strength = self.strengths.get(unit.tag)
+    if strength is None:
+      strength = self.strengths[unit.tag] = self.factor(unit) * (unit.health + unit.shield)
+    return strength
+
+  def total(self, units):
+    return sum(self.strength(u) for u in units)
+
+  def optimism(self, units, enemy_units):
+    return (self.total(units) + 1000) / (self.total(enemy_units) + 1000)
+
+  @property
+  def army_strength(self):
+    # our whole ready army, not counting workers
+    self.refresh()
+    if self._army_strength is None:
+      units = self.bot.shared.snapshot.units
+      strengths = units.dps * np.where(units.massive, 2, 1) * (units.hp + units.shield)
+      self._army_strength = float(strengths[units.ready & ~units.worker].sum())
+    return self._army_strength
+
+  def army_optimism(self):
+    return (self.army_strength + 1000) / (self.bot.shared.known_enemies.army_strength + 1000)
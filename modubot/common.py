@@ -1,5 +1,6 @@
 import asyncio
 import itertools
+import logging
 import random
 
 import sc2
@@ -11,6 +12,10 @@ from sc2.dicts.upgrade_researched_from import UPGRADE_RESEARCHED_FROM
 from sc2.dicts.unit_train_build_abilities import TRAIN_INFO
 from sc2.dicts.unit_research_abilities import RESEARCH_INFO
 
+from modubot.planners.placement import PlacementGrid
+from modubot.planners.slots import StructureSlots
+from modubot.tech import WAIT
+
 BaseStructures = {
   UnitTypeId.NEXUS,
   UnitTypeId.COMMANDCENTER,
@@ -21,6 +26,14 @@ BaseStructures = {
   UnitTypeId.HIVE
 }
 
+_LOG_LEVELS = {
+  'debug': logging.DEBUG,
+  'info': logging.INFO,
+  'warn': logging.WARNING,
+  'warning': logging.WARNING,
+  'error': logging.ERROR,
+}
+
 class LoggerWithFields(object):
   def __init__(self, logger, fields):
     self.logger = logger
@@ -30,10 +43,14 @@ class LoggerWithFields(object):
     return LoggerWithFields(self.logger, {**self.fields, **fields})
 
   def __getattr__(self, name):
-    if name not in ['debug','info','warn','warning','error']:
+    if name not in _LOG_LEVELS:
       return getattr(self.logger, name)
 
     def log_with_fields(msg):
+      # don't bother building the record if it's going to be thrown away
+      if not self.logger.isEnabledFor(_LOG_LEVELS[name]):
+        return
+
       if isinstance(msg, str):
         msg = {"message": msg}
 
@@ -63,17 +80,48 @@ class BasePlanner():
   def __init__(self, bot):
     self.bot = bot
     self.plans = dict()
+    self.slots = StructureSlots()
+    self.placement = PlacementGrid(bot.game_info, bot.map_cache)
     return
 
   def __getattr__(self, name):
     return getattr(self.bot, name)
 
+  # plans are made when a townhall is started (or found complete, like the first one) and dropped when it dies;
+  # the slots they leave free are kept up to date as structures go up and come down
+  def add_base(self, base):
+    if base.tag not in self.plans:
+      self.plans[base.tag] = self.initialize_plans(base)
+      self.slots.add_base(base.tag, self.plans[base.tag], self.structures)
+
+  def on_building_construction_started(self, unit):
+    if unit.type_id in BaseStructures:
+      self.add_base(unit)
+    self.slots.occupy(unit.tag, unit.position)
+
+  def on_building_construction_complete(self, unit):
+    if unit.type_id in BaseStructures:
+      self.add_base(unit)
+    self.slots.occupy(unit.tag, unit.position)
+
+  def on_unit_destroyed(self, tag):
+    self.plans.pop(tag, None)
+    self.slots.remove_base(tag)
+    self.slots.release(tag)
+
   def may_place(self, structure_type):
     return True
 
   def get_available_positions(self, structure_type):
     raise NotImplementedError("You must override this function")
 
+  async def first_placeable(self, structure_type, locations):
+    # every location is checked in one query, rather than a round trip each until one fits
+    if not locations:
+      return None
+    placeable = await self.can_place(structure_type, list(locations))
+    return next((location for (location, ok) in zip(locations, placeable) if ok), None)
+
   def increase_buildable_area(self):
     raise NotImplementedError("Your base planner could not find anywhere to put the structure. Implement the increase_buildable_area function in your base planner.")
 
@@ -85,6 +133,15 @@ class BuildRequest():
     self.force_target = force_target
     self.near = near
 
+  def ability_candidates(self, bot):
+    # units fulfill() may ask about; worker-built structures don't need to ask
+    if self.expense == UnitTypeId.CREEPTUMOR:
+      return bot.structures.tags_in(bot.shared.unused_tumors)
+    if self.expense not in UNIT_TRAINED_FROM or bot.shared.common_worker in UNIT_TRAINED_FROM[self.expense]:
+      return []
+    own = bot.shared.snapshot.own
+    return own.select(own.of_type(UNIT_TRAINED_FROM[self.expense]) & ~own.active)
+
   async def fulfill(self, bot):
     if self.expense not in UNIT_TRAINED_FROM:
       # probably larva. This means we just don't have enough larva for what we want.
@@ -95,23 +152,22 @@ class BuildRequest():
       await self.fulfill_creep_tumor_request(bot)
       return
 
-    all_units = bot.units + bot.structures
+    own = bot.shared.snapshot.own
     creator_types = { t for t in UNIT_TRAINED_FROM[self.expense] if t != UnitTypeId.WARPGATE }
-    root_type = all_units(creator_types).first.type_id if all_units(creator_types).exists else list(creator_types)[0]
+    creators = own.select(own.of_type(creator_types))
+    root_type = creators.first.type_id if creators.exists else list(creator_types)[0]
     ability = TRAIN_INFO[root_type][self.expense]['ability']
-    builders = all_units(root_type)
+    builders = own.select(own.of_type(root_type))
 
-    if (self.expense in bot.limits and all_units(self.expense).amount + bot.already_pending(self.expense) >= bot.limits[self.expense]()):
+    if (self.expense in bot.limits and own.of_type(self.expense).sum() + bot.already_pending(self.expense) >= bot.limits[self.expense]()):
       return
 
-    if 'required_building' in TRAIN_INFO[root_type][self.expense]:
-      dependency_type = TRAIN_INFO[root_type][self.expense]['required_building']
-      dependents = all_units(dependency_type)
-      if dependents.empty and not bot.already_pending(dependency_type):
-        return BuildRequest(dependency_type, self.urgency)
-
-      if dependents.ready.empty:
-        return
+    # straight to the first thing missing from the tech tree, rather than one request per step down it
+    unmet = bot.shared.tech.unmet(self.expense)
+    if unmet is WAIT:
+      return
+    if unmet:
+      return BuildRequest(unmet, self.urgency)
 
     if bot.shared.common_worker not in creator_types:
       # this is either a unit, or a structure which is "morphed" from another structure
@@ -121,8 +177,10 @@ class BuildRequest():
         return await self.fulfill_by_warp_in(bot)
 
       selected_builder = None
-      for builder in builders.filter(lambda b: not b.is_active):
-        abilities = await bot.get_available_abilities(builder)
+      idle_builders = builders.filter(lambda b: not b.is_active)
+      await bot.shared.abilities.prefetch(idle_builders)
+      for builder in idle_builders:
+        abilities = await bot.shared.abilities.get(builder)
         if ability in abilities:
           selected_builder = builder
           break
@@ -144,11 +202,11 @@ class BuildRequest():
     if self.force_target:
       return workers.closest_to(self.force_target).build(self.expense, self.force_target)
 
-    targets = bot.planner.get_available_positions(self.expense, near=self.near)
-    for location in targets:
-      can_build = await bot.can_place_single(self.expense, location)
-      if can_build:
-        return workers.closest_to(location).build(self.expense, location)
+    with bot.profiler.measure("planner", type(bot.planner).__name__):
+      targets = bot.planner.get_available_positions(self.expense, near=self.near)
+    location = await bot.planner.first_placeable(self.expense, targets)
+    if location:
+      return workers.closest_to(location).build(self.expense, location)
 
     bot.log.warning("Failed to build structure due to poor planning!")
     await bot.planner.increase_buildable_area(workers)
@@ -160,8 +218,9 @@ class BuildRequest():
     placement = await bot.find_placement(TRAIN_INFO[UnitTypeId.WARPGATE][self.expense]['ability'], pos, placement_step=1)
     if placement:
       warpgates = bot.structures(UnitTypeId.WARPGATE).ready
+      await bot.shared.abilities.prefetch(warpgates)
       for gate in warpgates:
-        abilities = await bot.get_available_abilities(gate)
+        abilities = await bot.shared.abilities.get(gate)
         # if we can't warp in either sentry or zealot, then the gate is busy
         # if we only can't warp in zealot, we might have enough gas for sentry or HT
         if all(a not in abilities for a in [AbilityId.WARPGATETRAIN_SENTRY, AbilityId.WARPGATETRAIN_ZEALOT]):
@@ -183,14 +242,15 @@ class BuildRequest():
           bot.do(capable_queens.closest_to(target)(AbilityId.BUILD_CREEPTUMOR_QUEEN, target))
       return
 
-    for tumor in ready_tumors:
-      tumor_abilities = await bot.get_available_abilities(tumor)
-      if AbilityId.BUILD_CREEPTUMOR_TUMOR in tumor_abilities:
-        target = bot.planner.tumor_tumor_position(tumor)
-        if target:
-          bot.do(tumor(AbilityId.BUILD_CREEPTUMOR_TUMOR, target))
-
+    await bot.shared.abilities.prefetch(ready_tumors)
+    spreading = [ t for t in ready_tumors if AbilityId.BUILD_CREEPTUMOR_TUMOR in await bot.shared.abilities.get(t) ]
+    # all at once, so that they spread in different directions
+    # tumors without a target stay unused; CreepSpreader checks them again later
+    for (tumor, target) in zip(spreading, bot.planner.tumor_positions(spreading)):
+      if target:
+        bot.do(tumor(AbilityId.BUILD_CREEPTUMOR_TUMOR, target))
         bot.shared.unused_tumors.discard(tumor.tag)
+        bot.shared.ordered_tumors.add(tumor.tag)
 
 class ResearchRequest():
   def __init__(self, upgrade, urgency):
@@ -199,26 +259,27 @@ class ResearchRequest():
     self.urgency = urgency
     self.expense = upgrade
 
+  def ability_candidates(self, bot):
+    return []
+
   async def fulfill(self, bot):
     bot.log.debug(f"fulfilling ResearchRequest for {self.expense}, urgency {self.urgency}")
+    if bot.already_pending_upgrade(self.upgrade):
+      # a request from an earlier step, for research that's since started
+      return
+    # the researcher is part of the tech tree too, so one that's on its way is waited for
+    unmet = bot.shared.tech.unmet(self.upgrade)
+    if unmet is WAIT:
+      return
+    if unmet:
+      return BuildRequest(unmet, self.urgency)
+
     structure_id = UPGRADE_RESEARCHED_FROM[self.upgrade]
-    structures = bot.structures(structure_id)
-    if structures.ready.filter(lambda s: not s.is_active).empty:
+    idle_structures = bot.structures(structure_id).ready.filter(lambda s: not s.is_active)
+    if idle_structures.empty:
       return BuildRequest(structure_id, self.urgency)
 
-    ability = RESEARCH_INFO[structure_id][self.upgrade]['ability']
-    prerequisite = structure_id
-    if 'required_building' in RESEARCH_INFO[structure_id][self.upgrade]:
-      prerequisite = RESEARCH_INFO[structure_id][self.upgrade]['required_building']
-
-    dependents = bot.structures(prerequisite)
-    if dependents.empty and not bot.already_pending(prerequisite):
-      return BuildRequest(prerequisite, self.urgency)
-
-    if dependents.ready.empty:
-      return
-
-    return structures.ready.filter(lambda s: not s.is_active).first(ability)
+    return idle_structures.first(RESEARCH_INFO[structure_id][self.upgrade]['ability'])
 
 def list_diff(first, second):
   second = set(second)
@@ -227,10 +288,6 @@ def list_diff(first, second):
 def list_flatten(list_of_lists):
   return [item for sublist in list_of_lists for item in sublist]
 
-def optimism(units, enemy_units):
-  return (sum(u.ground_dps * (u.health + u.shield) * (2 if u.is_massive else 1) for u in units) + 1000) /\
-         (sum(u.ground_dps * (u.health + u.shield) * (2 if u.is_massive else 1) for u in enemy_units) + 1000)
-
 def dps(units):
   return sum(u.ground_dps for u in units)
 
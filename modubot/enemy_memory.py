@@ -0,0 +1,118 @@
+import numpy as np
+
+from sc2.units import Units
+
+from modubot.common import is_worker
+
+# What we last saw of one enemy unit.
+class EnemyRecord():
+  __slots__ = ('tag', 'type_id', 'position', 'last_seen', 'hp', 'dps', 'strength', 'is_worker', 'unit', 'row')
+
+  def __init__(self, tag, row):
+    self.tag = tag
+    self.row = row   # where its position is kept in EnemyMemory.positions
+
+  def refresh(self, unit, time, strength):
+    self.type_id = unit.type_id
+    self.position = unit.position
+    self.last_seen = time
+    self.hp = unit.health + unit.shield
+    self.dps = unit.ground_dps
+    self.strength = strength
+    self.is_worker = is_worker(unit)
+    # the Unit as it was last seen, for code that needs the full object
+    self.unit = unit
+
+  @property
+  def army_strength(self):
+    return 0 if self.is_worker else self.strength
+
+# Every enemy unit seen so far, shared through `bot.shared.known_enemies`.
+#
+# Only the units seen this step are touched by `update`; everything else keeps what was last seen of it.
+# Records are also indexed by type, and their positions are kept in one array so distance queries are a single numpy expression.
+# Units that haven't been seen for `forget_after` seconds are dropped, on the assumption that they have died or moved on.
+# The strength of everything remembered except workers (see CombatValues) is kept as a running total.
+class EnemyMemory():
+  def __init__(self, bot, forget_after=120):
+    self.bot = bot
+    self.forget_after = forget_after
+    self.records = dict()      # tag -> EnemyRecord
+    self.by_type = dict()      # type id -> set of tags
+    self.positions = np.zeros((64, 2))
+    self.free_rows = list(range(63, -1, -1))
+    self._units = None
+    self.last_expiry = 0
+    self.army_strength = 0
+
+  def __len__(self):
+    return len(self.records)
+
+  def __iter__(self):
+    return iter(self.records.values())
+
+  def __contains__(self, tag):
+    return tag in self.records
+
+  def update(self, enemy_units, time):
+    for unit in enemy_units:
+      record = self.records.get(unit.tag)
+      if not record:
+        record = self.records[unit.tag] = EnemyRecord(unit.tag, self.take_row())
+      else:
+        self.army_strength -= record.army_strength
+        if record.type_id != unit.type_id:
+          # morphed
+          self.by_type[record.type_id].discard(record.tag)
+      record.refresh(unit, time, self.bot.shared.combat.strength(unit))
+      self.army_strength += record.army_strength
+      self.by_type.setdefault(record.type_id, set()).add(record.tag)
+      self.positions[record.row] = unit.position_tuple
+    self._units = None
+
+    if time - self.last_expiry >= 1:
+      self.last_expiry = time
+      for record in [ r for r in self.records.values() if time - r.last_seen > self.forget_after ]:
+        self.forget(record.tag)
+      # start the running total over now and then, so rounding errors don't pile up
+      self.army_strength = sum(r.army_strength for r in self.records.values())
+
+  def take_row(self):
+    if not self.free_rows:
+      size = len(self.positions)
+      self.positions = np.concatenate([ self.positions, np.zeros((size, 2)) ])
+      self.free_rows = list(range(size * 2 - 1, size - 1, -1))
+    return self.free_rows.pop()
+
+  def forget(self, tag):
+    record = self.records.pop(tag, None)
+    if record:
+      self.by_type[record.type_id].discard(tag)
+      self.free_rows.append(record.row)
+      self.army_strength -= record.army_strength
+      self._units = None
+
+  def of_type(self, types):
+    return [ self.records[tag] for t in types for tag in self.by_type.get(t, ()) ]
+
+  def count(self, types):
+    return sum(len(self.by_type.get(t, ())) for t in types)
+
+  def near(self, distance, positions, minimum=1):
+    # records with at least `minimum` of `positions` closer than `distance`
+    if not self.records or not positions:
+      return []
+    records = list(self.records.values())
+    rows = self.positions[[ r.row for r in records ]]
+    points = np.array([ (p[0], p[1]) for p in positions ], dtype=float)
+    offsets = rows[:, np.newaxis, :] - points[np.newaxis, :, :]
+    close = (offsets * offsets).sum(axis=2) < distance * distance
+    return [ r for (r, n) in zip(records, close.sum(axis=1)) if n >= minimum ]
+
+  def units(self, records=None):
+    # as a Units collection; the whole memory is only converted once per update
+    if records is not None:
+      return Units([ r.unit for r in records ], self.bot)
+    if self._units is None:
+      self._units = Units([ r.unit for r in self.records.values() ], self.bot)
+    return self._units
@@ -15,12 +15,30 @@ class HarassmentMission():
     self.condition = when
     self.desired_army = harass_with
     self.status = HarassmentMissionStatus.PENDING
-    self.active_attackers = set()
     self.order_given = set()
+    # the Harasser running this mission claims its attackers, so they add up to the Harasser's own allocation
+    self.module = None
+    self.attackers = set()
 
   def __getattr__(self, name):
     return getattr(self.bot, name)
 
+  @property
+  def active_attackers(self):
+    return self.attackers
+
+  def claim(self, tags):
+    self.bot.allocations.claim(self.module, tags, Urgency.VERYHIGH)
+    self.attackers |= tags
+
+  def release(self, tags):
+    self.bot.allocations.release(self.module, tags)
+    self.attackers -= tags
+
+  def deallocate(self, tag_set):
+    # the registry has already dropped the tags
+    self.attackers -= tag_set
+
   async def on_step(self):
     if self.status == HarassmentMissionStatus.PENDING:
       if self.condition():
@@ -40,8 +58,7 @@ class HarassmentMission():
       if units_ready:
         for unit_type in self.desired_army.keys():
           aggressors = { u.tag for u in self.unallocated(unit_type, Urgency.VERYHIGH) }
-          self.deallocate(aggressors)
-          self.active_attackers = self.active_attackers.union(aggressors)
+          self.claim(aggressors)
         self.bot.log.info("Harassment Mission Status: Attacking")
         self.status = HarassmentMissionStatus.ATTACKING
       else:
@@ -50,11 +67,11 @@ class HarassmentMission():
     if self.status == HarassmentMissionStatus.ATTACKING:
       tagged_units = self.units.tags_in(self.active_attackers)
       if tagged_units.empty:
-        self.active_attackers = set()
+        self.release(set(self.active_attackers))
         self.bot.log.info("Harassment Mission Status: Complete")
         self.status = HarassmentMissionStatus.COMPLETE
       else:
-        self.active_attackers = { u.tag for u in tagged_units }
+        self.release(self.active_attackers - tagged_units.tags)
         order_required = tagged_units.filter(lambda u: u.tag not in self.order_given)
         if order_required.empty:
           return  # don't need to return requests at this point; building happens only when status is building
@@ -0,0 +1,115 @@
+import time
+
+from s2clientprotocol import sc2api_pb2 as sc_pb
+
+from sc2.client import Client
+from sc2.data import Result, Status
+from sc2.game_state import GameState
+
+# Plays a recorded game back to a bot, with no game running.
+#
+# StandInClient takes the place of the websocket client. It answers every request from the recording,
+# so the rest of python-sc2 (and the bot) works as it would against a real game:
+# - observations, game info and game data come back as recorded, one frame per observation request
+# - queries get the answer recorded for the same question in the same frame, or the latest earlier answer,
+#   or an empty one (no abilities, not placeable, no path) if it was never asked
+# - actions, chat, debug drawing and camera moves are accepted and dropped
+# The bot's actions don't change what happens next, so this is a benchmark and profiling target, not a simulation.
+class StandInClient(Client):
+  def __init__(self, recording):
+    # nothing goes over a socket, but Protocol insists on being given one
+    super().__init__(ws=recording)
+    self.recording = recording
+    self._player_id = recording.player_id
+    self._status = Status.in_game
+    self.frame_index = -1
+    self.earlier_answers = dict()
+
+  @property
+  def frame(self):
+    return self.recording.frames[max(self.frame_index, 0)]
+
+  @property
+  def frames_remaining(self):
+    return len(self.recording.frames) - self.frame_index - 1
+
+  async def _execute(self, **kwargs):
+    assert len(kwargs) == 1, "Only one request allowed"
+    ((field, request),) = kwargs.items()
+    response = sc_pb.Response(status=self._status.value)
+
+    if field == 'observation':
+      if self.frame_index >= 0:
+        self.earlier_answers.update(self.frame.answers)
+      self.frame_index += 1
+      response.observation.MergeFromString(self.frame.observation)
+    elif field == 'game_info':
+      response.game_info.MergeFromString(self.frame.game_info)
+    elif field == 'data':
+      response.data.MergeFromString(self.recording.data)
+    elif field == 'ping':
+      response.ping.MergeFromString(self.recording.ping or b'')
+    elif field == 'query':
+      self.answer(request, response.query)
+    elif field == 'leave_game':
+      self._status = Status.ended
+      response.status = self._status.value
+      response.leave_game.SetInParent()
+    else:
+      getattr(response, field).SetInParent()
+
+    return response
+
+  def answer(self, request, response):
+    for field in [ 'pathing', 'abilities', 'placements' ]:
+      for question in getattr(request, field):
+        key = (field, request.ignore_resource_requirements, question.SerializeToString())
+        answer = getattr(response, field).add()
+        recorded = self.frame.answers.get(key) or self.earlier_answers.get(key)
+        if recorded:
+          answer.MergeFromString(recorded)
+        elif field == 'abilities':
+          answer.unit_tag = question.unit_tag
+
+# Steps `bot` through every frame of `recording`, the way sc2.main does for a real game (realtime=False).
+# Returns the number of steps taken and the wall time they took, including python-sc2's own per-step work.
+async def replay(bot, recording):
+  client = StandInClient(recording)
+  bot._initialize_variables()
+
+  game_data = await client.get_game_data()
+  game_info = await client.get_game_info()
+  ping_response = await client.ping()
+  bot._prepare_start(client, recording.player_id, game_info, game_data, realtime=False, base_build=ping_response.ping.base_build)
+
+  iteration = 0
+  start = time.perf_counter()
+  while client.frames_remaining:
+    state = await client.observation()
+    if client._game_result:
+      await bot.on_end(client._game_result[recording.player_id])
+      break
+
+    proto_game_info = await client._execute(game_info=sc_pb.RequestGameInfo())
+    bot._prepare_step(GameState(state.observation), proto_game_info)
+    if iteration == 0:
+      await bot.on_before_start()
+      bot._prepare_first_step()
+      await bot.on_start()
+
+    await bot.issue_events()
+    await bot.on_step(iteration)
+    await bot._after_step()
+    iteration += 1
+
+    if client._game_result:
+      # the bot left the game
+      await bot.on_end(client._game_result[recording.player_id])
+      break
+
+    await client.step()
+  else:
+    # the recording stopped before the game did
+    await bot.on_end(Result.Tie)
+
+  return (iteration, time.perf_counter() - start)
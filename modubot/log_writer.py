@@ -0,0 +1,81 @@
+import logging
+import queue
+import threading
+
+# Writes log records to a file from a background thread, so logging never waits on the disk.
+#
+# Records are handed over through a bounded queue. The writer thread formats them and
+# appends them in batches. If it falls behind far enough to fill the queue, new records
+# are dropped (and counted) rather than stalling the game step.
+class BackgroundFileHandler(logging.Handler):
+  def __init__(self, filename, encoding='utf-8', max_queued=10000, batch_size=500):
+    super().__init__()
+    self.filename = filename
+    self.encoding = encoding
+    self.batch_size = batch_size
+    self.records = queue.Queue(maxsize=max_queued)
+    self.dropped = 0
+    self.reported_dropped = 0
+    self.writer = threading.Thread(target=self.write_forever, name="log-writer", daemon=True)
+    self.writer.start()
+
+  def emit(self, record):
+    try:
+      self.records.put_nowait(record)
+    except queue.Full:
+      self.dropped += 1
+
+  def flush(self):
+    # blocks until everything handed over so far has been written
+    if self.writer.is_alive():
+      self.records.join()
+
+  def close(self):
+    if self.writer.is_alive():
+      self.records.put(None)
+      self.writer.join()
+    super().close()
+
+  def next_batch(self):
+    batch = [ self.records.get() ]
+    while len(batch) < self.batch_size:
+      try:
+        batch.append(self.records.get_nowait())
+      except queue.Empty:
+        break
+    return batch
+
+  def format_batch(self, batch):
+    lines = []
+    for record in batch:
+      if record is None:
+        continue
+      try:
+        lines.append(self.format(record))
+      except Exception:
+        self.handleError(record)
+
+    if self.dropped > self.reported_dropped:
+      lines.append(self.format(logging.makeLogRecord({
+        "levelno": logging.WARNING,
+        "levelname": "WARNING",
+        "msg": { "message": "Log records dropped", "dropped": self.dropped - self.reported_dropped },
+      })))
+      self.reported_dropped = self.dropped
+
+    return lines
+
+  def write_forever(self):
+    with open(self.filename, 'a', encoding=self.encoding) as stream:
+      while True:
+        batch = self.next_batch()
+        lines = self.format_batch(batch)
+        if lines:
+          stream.write('\n'.join(lines) + '\n')
+          stream.flush()
+
+        for _ in batch:
+          self.records.task_done()
+
+        if None in batch:
+          return
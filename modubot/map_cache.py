@@ -0,0 +1,46 @@
+import hashlib
+import os
+import re
+
+import numpy as np
+
+# Map analysis saved between games, one .npz file per map.
+#
+# Files are named after the map and a hash of its pathing, placement and height grids, so an updated map
+# (or one that only shares a name) is analysed again rather than mixed up with the old one.
+# Whatever isn't in the file yet is worked out during the game and written back at the end of `on_start`.
+# The whole file is read when the cache is opened (everything in it is needed at the start anyway), and closed again.
+class MapCache():
+  def __init__(self, game_info, directory):
+    start = game_info._proto.start_raw
+    digest = hashlib.sha1()
+    for grid in [ start.pathing_grid, start.placement_grid, start.terrain_height ]:
+      digest.update(grid.data)
+    name = re.sub(r'[^A-Za-z0-9]+', '', game_info.map_name)
+    self.filename = os.path.join(directory, f"{name}-{digest.hexdigest()[:12]}.npz")
+    self.saved = dict()
+    if os.path.exists(self.filename):
+      with np.load(self.filename) as saved:
+        self.saved = { name: saved[name] for name in saved.files }
+    self.added = dict()
+
+  def get(self, name):
+    if name in self.added:
+      return self.added[name]
+    return self.saved.get(name)
+
+  def put(self, name, array):
+    self.added[name] = array
+
+  def save(self):
+    if not self.added:
+      return
+    arrays = { **self.saved, **self.added }
+    os.makedirs(os.path.dirname(self.filename) or '.', exist_ok=True)
+    # several games may finish analysing the same map at once; whichever is last to rename wins, and they agree anyway
+    partial = f"{self.filename}.{os.getpid()}.tmp"
+    with open(partial, 'wb') as stream:
+      np.savez(stream, **arrays)
+    os.replace(partial, self.filename)
+    self.saved = arrays
+    self.added = dict()
@@ -1,4 +1,4 @@
-from .army import SimpleArmyBuilder
+from .army import SimpleArmyBuilder, UnitBreakdownLogger
 from .attack import AttackBases
 from .camera import SpectatorCamera
 from .chat import OptimismChatter
@@ -1,3 +1,4 @@
+import logging
 import math
 from sc2.constants import UpgradeId, UnitTypeId
 
@@ -34,11 +35,17 @@ class SimpleArmyBuilder(BotModule):
       # each unit request is lower priority than the last
       urgency -= 1
 
-    self.log_unit_breakdown()
-
     return requests
 
-  def log_unit_breakdown(self):
+# Logs how much supply goes to each unit type now and then, which is plenty for following a game afterwards.
+class UnitBreakdownLogger(BotModule):
+  interval = 10
+  budget = 1
+
+  async def on_step(self, iteration):
+    if not self.log.isEnabledFor(logging.INFO):
+      return
+
     units = {}
     for u in self.units:
       tid = str(u.type_id)
@@ -20,7 +20,6 @@ class AttackBases(BotModule):
     if unit in self.allocated and self.attack_objective.status == ObjectiveStatus.STAGING:
       self.attack_objective.log.info("Upgrading to active because a unit was killed while staging")
       self.attack_objective.status = ObjectiveStatus.ACTIVE
-    self.allocated.discard(unit)
     # for o in self.cleanup_objectives:
     #   o.allocated.discard(unit)
 
@@ -30,6 +29,7 @@ class AttackBases(BotModule):
       await self.attack_objective.tick()
       if self.attack_objective.is_complete():
         self.shared.victims = Units([], self.bot)
+        self.release(self.allocated)
         self.attack_objective = None
       else:
         self.shared.victims = self.attack_objective.enemies
@@ -42,13 +42,13 @@ class AttackBases(BotModule):
     #     self.cleanup_objectives.remove(cleanup)
 
     if (self.supply_used > 196 or self.shared.optimism > 1.5) and not self.attack_objective:
-      known_enemy_units = self.shared.known_enemy_units.values()
+      known_enemies = self.shared.known_enemies
       enemy_bases = self.enemy_structures(BaseStructures)
       if enemy_bases.exists:
         self.attack_objective = AttackObjective(
           self,
           enemy_bases.furthest_to(
-            Point2.center([ u.position for u in known_enemy_units ]) if known_enemy_units
+            Point2.center([ r.position for r in known_enemies ]) if known_enemies
             else self.enemy_start_locations[0]
           ).position
         )
@@ -64,19 +64,6 @@ class AttackBases(BotModule):
     #     for e in self.enemy_structures(BaseStructures) if e.position != self.attack_objective.target
     #  ]
 
-  @property
-  def allocated(self):
-    # cleaners = (o.allocated for o in self.cleanup_objectives)
-    # attackers = self.attack_objective.allocated if self.attack_objective else set()
-    # return attackers.union(*cleaners)
-    return self.attack_objective.allocated if self.attack_objective else set()
-
   @property
   def urgency(self):
     return Urgency.MEDIUM
-
-  def deallocate(self, tag_set):
-    if self.attack_objective:
-      self.attack_objective.allocated.difference_update(tag_set)
-    # for objective in self.cleanup_objectives:
-    #   objective.allocated.difference_update(tag_set)
@@ -7,6 +7,9 @@ from .module import BotModule
 from modubot.common import is_worker
 
 class OptimismChatter(BotModule):
+  interval = 1
+  budget = 1
+
   def __init__(self, bot):
     super().__init__(bot)
     self.version_reported = False
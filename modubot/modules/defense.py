@@ -14,9 +14,6 @@ class DefendBases(BotModule):
     bot.shared.defenders = Units([], bot)
     bot.shared.threats = Units([], bot)
 
-  async def on_unit_destroyed(self, unit):
-    self.allocated.discard(unit)
-
   async def on_step(self, iteration):
     self.shared.defenders = self.units.tags_in(self.allocated)
 
@@ -24,6 +21,7 @@ class DefendBases(BotModule):
       await self.defense_objective.tick()
       if self.defense_objective.is_complete():
         self.shared.threats = Units([], self.bot)
+        self.release(self.allocated)
         self.defense_objective = None
       else:
         self.shared.threats = self.defense_objective.enemies
@@ -31,10 +29,11 @@ class DefendBases(BotModule):
 
     #enemies within 20 units of at least 2 of my structures
     # or, within 15 of the rally point
+    spatial = self.shared.spatial
     threatening_enemies = self.enemy_units.filter(lambda enemy:
       not enemy.is_snapshot and (
-        self.townhalls.closer_than(20, enemy.position).exists or
-        self.structures.closer_than(20, enemy.position).amount > 2 or
+        spatial.townhalls.closer_than(20, enemy.position).exists or
+        spatial.structures.closer_than(20, enemy.position).amount > 2 or
         enemy.position.is_closer_than(20, self.shared.rally_point)
       )
     )
@@ -42,14 +41,6 @@ class DefendBases(BotModule):
     if threatening_enemies.exists:
       self.defense_objective = DefenseObjective(self)
 
-  @property
-  def allocated(self):
-    return self.defense_objective.allocated if self.defense_objective else set()
-
   @property
   def urgency(self):
     return Urgency.VERYHIGH
-
-  def deallocate(self, tag_set):
-    if self.defense_objective:
-      self.defense_objective.allocated.difference_update(tag_set)
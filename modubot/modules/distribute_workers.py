@@ -1,116 +1,165 @@
-from sc2.constants import UnitTypeId, AbilityId
-from sc2.units import Units
+from sc2.constants import AbilityId
 
-from modubot.common import list_flatten
 from modubot.modules.module import BotModule
 
+_ATTACK_ABILITIES = { AbilityId.ATTACK_ATTACKTOWARDS, AbilityId.ATTACK_ATTACK, AbilityId.ATTACK }
+
+# Keeps workers mining where they are needed.
+#
+# Which mineral field belongs to which base, and which workers mine each field, are remembered between steps:
+# - fields are matched to bases when the set of ready bases changes, and dropped when they are mined out
+# - a worker keeps its field while it carries minerals home, and loses it when it starts doing anything else
+# The game reports saturation per base and per gas building but not per field, so the model fills that in,
+# and new workers go to the emptiest field of a base that needs them rather than a random one.
+# Only the workers that need to move are given orders, so this is cheap enough to run every step.
 class WorkerDistributor(BotModule):
   def __init__(self, bot):
     super().__init__(bot)
-    self.last_distribute = 0
+    self.base_tags = set()       # the ready bases the fields were matched to
+    self.mineral_bases = dict()  # mineral field tag -> base tag
+    self.field_workers = dict()  # mineral field tag -> set of worker tags
+    self.worker_fields = dict()  # worker tag -> mineral field tag
 
   async def on_step(self, iteration):
     self.distribute_workers()
 
-  def distribute_workers(self):
-    # Only do anything once every 3 seconds
-    if self.time - self.last_distribute < 3:
-      return
-
-    self.last_distribute = self.time
+  async def on_unit_destroyed(self, tag):
+    if tag in self.worker_fields:
+      self.unassign(tag)
+    elif tag in self.mineral_bases:
+      # mined out
+      del self.mineral_bases[tag]
+      for worker_tag in self.field_workers.pop(tag, set()):
+        del self.worker_fields[worker_tag]
+
+  def assign(self, worker_tag, field_tag):
+    if self.worker_fields.get(worker_tag) != field_tag:
+      self.unassign(worker_tag)
+      self.worker_fields[worker_tag] = field_tag
+      self.field_workers.setdefault(field_tag, set()).add(worker_tag)
+
+  def unassign(self, worker_tag):
+    field_tag = self.worker_fields.pop(worker_tag, None)
+    if field_tag is not None:
+      self.field_workers[field_tag].discard(worker_tag)
+
+  def match_fields(self, bases):
+    # mineral fields near one of our bases, each belonging to the closest one
+    self.base_tags = bases.tags
+    fields = self.shared.spatial.mineral_field.closer_than_any(15, [ base.position for base in bases ])
+    self.mineral_bases = { f.tag: bases.closest_to(f.position).tag for f in fields }
+    for worker_tag in [ w for (w, f) in self.worker_fields.items() if f not in self.mineral_bases ]:
+      self.unassign(worker_tag)
+
+  def observe(self):
+    # returns the workers carrying minerals home, by the base they're taking them to
+    returning = dict()
+    seen = set()
+    for worker in self.workers:
+      seen.add(worker.tag)
+      if worker.is_gathering and worker.order_target in self.mineral_bases:
+        self.assign(worker.tag, worker.order_target)
+      elif worker.is_returning:
+        if worker.is_carrying_minerals:
+          returning.setdefault(worker.order_target, []).append(worker)
+      else:
+        self.unassign(worker.tag)
+
+    # workers that turned into something else
+    for worker_tag in self.worker_fields.keys() - seen:
+      self.unassign(worker_tag)
+    return returning
 
+  def distribute_workers(self):
     # Kinda hard to gather anything without a base
-    if not self.townhalls.ready.exists:
+    bases = self.shared.views.ready_townhalls
+    if not bases.exists:
       return
 
-    # mineral patches near one of our bases
-    acceptable_minerals = self.mineral_field.filter(
-      lambda node: any([
-        nex.position.is_closer_than(15, node.position)
-        for nex in self.townhalls.ready
-      ])
-    )
-
-    workers_per_gas = 1 + min(2, int(self.workers.amount / acceptable_minerals.amount))
+    if bases.tags != self.base_tags:
+      self.match_fields(bases)
+    returning = self.observe()
 
+    workers_per_gas = 1 + min(2, int(self.workers.amount / max(len(self.mineral_bases), 1)))
     if self.minerals < 50 and self.vespene > 300:
       workers_per_gas -= 1
 
-    # gas buildings probably at bases that have been destroyed
-    bad_geysers = self.structures(
-      self.shared.gas_structure
-    ).filter(
-      lambda a: all(ex.is_further_than(15, a) for ex in self.owned_expansions.keys())
-                or a.vespene_contents == 0
-                or a.assigned_harvesters > workers_per_gas
-    )
-
-    # gas buildings that don't have enough harvesters
-    needy_geysers = self.structures(
-      self.shared.gas_structure
-    ).ready.tags_not_in([
-      a.tag
-      for a in bad_geysers
-    ]).filter(
-      lambda a: a.assigned_harvesters < workers_per_gas
-    )
-
-    # tag collections for easy selection and matching
-    acceptable_mineral_tags = [ f.tag for f in acceptable_minerals ]
-    needy_mineral_tags = [
-      f.tag
-      for f in acceptable_minerals
-      if self.townhalls.closest_to(f.position).surplus_harvesters < 0
-    ]
-
-    # anywhere else is strictly forbidden
-    unacceptable_mineral_tags = [ f.tag for f in self.mineral_field.tags_not_in(acceptable_mineral_tags) ]
-
-    bad_workers = self.unallocated(self.shared.worker_types).filter(lambda p:
-      # Grab these suckers first
-      p.is_idle or
-      (p.is_gathering and p.orders[0].target in unacceptable_mineral_tags) or
-      (p.is_gathering and p.orders[0].target in bad_geysers) or
-      p.orders[0].ability.id in [ AbilityId.ATTACK_ATTACKTOWARDS,
-                               AbilityId.ATTACK_ATTACK,
-                               AbilityId.ATTACK ]
-    )
+    gas_buildings = self.shared.views.gas_buildings
+    expansions = list(self.owned_expansions.keys())
+    # how many workers should leave each gas building: all of them at bases that have been lost or that have run dry
+    gas_surplus = {
+      a.tag: a.assigned_harvesters if a.vespene_contents == 0 or all(ex.is_further_than(15, a) for ex in expansions)
+        else a.assigned_harvesters - workers_per_gas
+      for a in gas_buildings
+    }
+    needy_geysers = gas_buildings.ready.filter(lambda a: gas_surplus[a.tag] < 0 and a.vespene_contents > 0)
+
+    # Grab these suckers first
+    bad_workers = []
+    mining_workers = []
+    for worker in self.unallocated(self.shared.worker_types):
+      target = worker.order_target
+      if worker.is_idle or worker.orders[0].ability.id in _ATTACK_ABILITIES:
+        bad_workers.append(worker)
+      elif worker.is_gathering and target in gas_surplus:
+        if gas_surplus[target] > 0:
+          gas_surplus[target] -= 1
+          bad_workers.append(worker)
+      elif worker.is_gathering and target not in self.mineral_bases:
+        # anywhere else is strictly forbidden
+        bad_workers.append(worker)
+      elif worker.is_gathering or worker.is_carrying_minerals:
+        mining_workers.append(worker)
 
     # up to N workers, where N is the number of surplus harvesters, from each base where there are any
-    # may not grab them all every time (it gets only the ones returning minerals), but it'll get enough
-    excess_workers = Units(list_flatten([
-        self.workers.filter(
-          lambda w: w.is_carrying_minerals and w.orders and w.orders[0].target == base.tag
-        )[0:base.surplus_harvesters] for base in self.townhalls.filter(lambda base: base.surplus_harvesters > 0)
-    ]), self)
-
-    # to fill up your first gas building, you'll need these
-    mining_workers = self.workers.filter(lambda p:
-      # if more are needed, this is okay too
-      p.is_gathering and (p.orders[0].target in acceptable_mineral_tags or p.is_carrying_minerals)
-    ) - (bad_workers + excess_workers)
+    # only the ones bringing minerals back are taken, so no trip is wasted; it'll get the rest on later steps
+    excess_workers = []
+    for base in bases:
+      if base.surplus_harvesters > 0:
+        excess_workers += returning.get(base.tag, [])[0:base.surplus_harvesters]
+    excess_tags = { w.tag for w in excess_workers }
+    bad_tags = { w.tag for w in bad_workers }
+    mining_workers = [ w for w in mining_workers if w.tag not in excess_tags and w.tag not in bad_tags ]
 
     usable_workers = bad_workers + excess_workers + mining_workers
-
     taken_workers = 0
     def get_workers(num):
       nonlocal taken_workers
-      if taken_workers + num > usable_workers.amount:
-        return []
-      taken_workers += num
-      return usable_workers[ taken_workers - num : taken_workers ]
+      taken = usable_workers[taken_workers : taken_workers + max(num, 0)]
+      taken_workers += len(taken)
+      return taken
 
     for needy_geyser in needy_geysers:
-      workers = get_workers(workers_per_gas - needy_geyser.assigned_harvesters)
-      for worker in workers:
+      for worker in get_workers(workers_per_gas - needy_geyser.assigned_harvesters):
+        self.unassign(worker.tag)
         self.do(worker.gather(needy_geyser))
 
-    if taken_workers < bad_workers.amount and acceptable_mineral_tags:
-      remaining_bad_workers = get_workers(bad_workers.amount - taken_workers)
-      for worker in remaining_bad_workers:
-        self.do(worker.gather(self.mineral_field.tags_in(acceptable_mineral_tags).random))
-
-    if taken_workers < bad_workers.amount + excess_workers.amount and needy_mineral_tags:
-      remaining_excess_workers = get_workers(bad_workers.amount + excess_workers.amount - taken_workers)
-      for worker in remaining_excess_workers:
-        self.do(worker.gather(self.mineral_field.tags_in(needy_mineral_tags).random))
+    shortfall = { base.tag: -base.surplus_harvesters for base in bases if base.surplus_harvesters < 0 }
+    if taken_workers < len(bad_workers) and self.mineral_bases:
+      for worker in get_workers(len(bad_workers) - taken_workers):
+        self.send_to_field(worker, shortfall, anywhere=True)
+
+    if taken_workers < len(bad_workers) + len(excess_workers):
+      for worker in get_workers(len(bad_workers) + len(excess_workers) - taken_workers):
+        if not self.send_to_field(worker, shortfall, anywhere=False):
+          break
+
+  def send_to_field(self, worker, shortfall, anywhere):
+    # the field with the fewest workers at a base that needs more, or at any base if `anywhere` and none do
+    fields = [ f for (f, b) in self.mineral_bases.items() if shortfall.get(b, 0) > 0 ]
+    if not fields and anywhere:
+      fields = list(self.mineral_bases.keys())
+    if not fields:
+      return False
+
+    field_tag = min(fields, key=lambda f: len(self.field_workers.get(f, ())))
+    field = self.mineral_field.find_by_tag(field_tag)
+    if not field:
+      return False
+
+    base_tag = self.mineral_bases[field_tag]
+    if base_tag in shortfall:
+      shortfall[base_tag] -= 1
+    self.assign(worker.tag, field_tag)
+    self.do(worker.gather(field))
+    return True
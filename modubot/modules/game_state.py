@@ -1,10 +1,12 @@
+import itertools
+
 import sc2
 from sc2.constants import UnitTypeId
 from sc2 import Race
 from sc2.units import Units
 
 from .module import BotModule
-from modubot.common import optimism, is_worker
+from modubot.enemy_memory import EnemyMemory
 
 class SurrenderedException(Exception):
   pass
@@ -13,7 +15,7 @@ class GameStateTracker(BotModule):
   def __init__(self, bot):
     super().__init__(bot)
     self.surrender_declared = None
-    bot.shared.known_enemy_units = dict()
+    bot.shared.known_enemies = EnemyMemory(bot)
     bot.shared.optimism = 1
 
   async def on_start(self):
@@ -42,18 +44,15 @@ class GameStateTracker(BotModule):
       await self._client.leave()
       raise SurrenderedException("Surrendered")
 
-    self.shared.optimism = optimism(
-      self.units.ready.filter(lambda u: not is_worker(u) and not u.is_structure),
-      (u for u in self.shared.known_enemy_units.values() if not is_worker(u) and not u.is_structure)
-    )
+    self.shared.optimism = self.shared.combat.army_optimism()
 
     if self.shared.optimism < 0.02 and not self.surrender_declared:
       self.surrender_declared = self.time
       await self.chat_send("(gameheart)(gg)(gameheart)")
 
-    for unit in self.enemy_units:
-      self.shared.known_enemy_units[unit.tag] = unit
+    self.shared.known_enemies.update(self.enemy_units, self.time)
+    self.shared.threat_map.update(itertools.chain(self.enemy_units, self.enemy_structures))
 
   async def on_unit_destroyed(self, tag):
-    self.shared.known_enemy_units.pop(tag, None)
+    self.shared.known_enemies.forget(tag)
 
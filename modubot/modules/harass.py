@@ -4,13 +4,15 @@ from sc2 import Race
 from sc2.units import Units
 
 from .module import BotModule
-from modubot.common import optimism, is_worker, Urgency
+from modubot.common import is_worker, Urgency
 from modubot.harassment.mission import HarassmentMissionStatus
 
 class Harasser(BotModule):
   def __init__(self, bot, missions=[]):
     super().__init__(bot)
     self.missions = missions
+    for mission in missions:
+      mission.module = self
 
   async def on_step(self, iteration):
     requests = []
@@ -21,17 +23,10 @@ class Harasser(BotModule):
 
     return requests
 
-  @property
-  def allocated(self):
-    harassers = set()
+  def deallocate(self, tag_set):
     for mission in self.missions:
-      harassers = harassers.union(mission.active_attackers)
-    return harassers
+      mission.deallocate(tag_set)
 
   @property
   def urgency(self):
     return Urgency.VERYHIGH
-
-  def deallocate(self, tag_set):
-    for mission in self.missions:
-      mission.active_attackers.difference_update(tag_set)
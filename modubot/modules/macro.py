@@ -1,9 +1,11 @@
+import math
+
 from sc2 import Race
 from sc2.constants import UnitTypeId, AbilityId
 from sc2.position import Point2
 from sc2.units import Units
 
-from modubot.common import list_flatten, BaseStructures, BuildRequest, Urgency, is_worker
+from modubot.common import list_flatten, BaseStructures, BuildRequest, Urgency
 from modubot.modules.module import BotModule
 
 class MacroManager(BotModule):
@@ -17,11 +19,11 @@ class MacroManager(BotModule):
     # self.gates.amount > 2 or gas_structs.amount < gates.amount
     self.gas_urgency = gas_urgency if gas_urgency \
       else lambda geysers: (Urgency.NONE if not geysers
-        else Urgency.HIGH if bot.structures(bot.shared.gas_structure).exists or bot.already_pending(bot.shared.gas_structure)
+        else Urgency.HIGH if bot.shared.views.gas_buildings.exists or bot.already_pending(bot.shared.gas_structure)
         else Urgency.VERYHIGH)
 
   async def on_step(self, iteration):
-    gas_structs = self.structures(self.shared.gas_structure)
+    gas_structs = self.shared.views.gas_buildings
     nodes = self.get_mineable_nodes()
 
     requests = self.check_worker_health(nodes, gas_structs) \
@@ -31,22 +33,25 @@ class MacroManager(BotModule):
     return requests
 
   def resource_centroid(self, townhall):
-    nodes = self.mineral_field.closer_than(15, townhall)
+    nodes = self.shared.spatial.mineral_field.closer_than(15, townhall)
     if nodes.exists:
       return Point2.center([ r.position for r in nodes ])
     else:
       return self.game_info.map_center
 
   def find_next_base(self):
-    centroid = self.bases_centroid() if self.townhalls.amount > 1 else self.main_base_ramp.bottom_center
+    # on foot, from the bottom of the main ramp, or on average from all of our bases
+    homes = [ th.position for th in self.townhalls ] if self.townhalls.amount > 1 else [ self.main_base_ramp.bottom_center ]
+    ground_distances = self.shared.ground_distances
     def distance_to_home(location):
-      return centroid.distance_to(location)
+      return sum(ground_distances.distance(location, home) for home in homes) / len(homes)
 
     all_possible_expansions = [
       loc
       for loc in list(self.expansion_locations_dict.keys())
       if loc not in self.owned_expansions.keys()
-        and not self.enemy_structures.closer_than(8, loc).exists
+        and not self.shared.spatial.enemy_structures.closer_than(8, loc).exists
+        and distance_to_home(loc) < math.inf
     ]
     return min(all_possible_expansions, key=distance_to_home) if all_possible_expansions else None
 
@@ -56,21 +61,22 @@ class MacroManager(BotModule):
   def get_mineable_nodes(self):
     return list_flatten([
       # intentionally includes expansions in progress
-      self.mineral_field.closer_than(15, th) for th in self.townhalls
+      self.shared.spatial.mineral_field.closer_than(15, th) for th in self.townhalls
     ])
 
   def get_empty_geysers(self, gas_structs):
+    spatial = self.shared.spatial
     return [
       vg for vg in
-      list_flatten([ self.vespene_geyser.closer_than(15, th) for th in self.townhalls.ready ])
-      if gas_structs.empty or gas_structs.closer_than(1.0, vg).empty
+      list_flatten([ spatial.vespene_geyser.closer_than(15, th) for th in self.shared.views.ready_townhalls ])
+      if gas_structs.empty or spatial.structures.closer_than(1.0, vg)(self.shared.gas_structure).empty
     ]
 
   def check_worker_health(self, nodes, gas_structs):
     requests = []
     # when a worker goes into a gas structure... the bot thinks it doesn't exist.
     numWorkers = self.workers.amount + gas_structs.amount
-    if numWorkers < min(1 + len(nodes) * 2 + gas_structs.amount * 3, self.worker_limit) and self.townhalls.ready.idle.exists:
+    if numWorkers < min(1 + len(nodes) * 2 + gas_structs.amount * 3, self.worker_limit) and self.shared.views.ready_townhalls.idle.exists:
       requests.append(BuildRequest(self.shared.common_worker, self.worker_urgency()))
     return requests
 
@@ -103,11 +109,12 @@ class MacroManager(BotModule):
     if not self.shared.next_base_location:
       return requests
 
-    destructables = self.destructables.filter(lambda d: d.position.is_closer_than(1.0, self.shared.next_base_location))
+    spatial = self.shared.spatial
+    destructables = spatial.destructables.closer_than(1.0, self.shared.next_base_location)
     if destructables.exists:
-      for unit in self.units.filter(lambda u: not is_worker(u)).idle:
+      for unit in self.shared.views.army.idle:
         self.do(unit.attack(destructables.first))
-    for unit in self.units.closer_than(5, self.shared.next_base_location):
+    for unit in spatial.units.closer_than(5, self.shared.next_base_location):
       # apparently, when a probe warps in a building, they become idle *before* the building has started warping
       if unit.is_idle and unit.type_id != self.shared.common_worker:
         self.do(unit.move(self.shared.next_base_location.towards(self.game_info.map_center, 10)))
@@ -2,6 +2,12 @@ from sc2.units import Units
 from modubot.common import Urgency
 
 class BotModule(object):
+  # how often on_step runs, in game seconds (0 is every step),
+  # and roughly how many ms it takes if it may be put off to a later step when this one is running long.
+  # modules that keep other modules' information up to date should leave the budget as None.
+  interval = 0
+  budget = None
+
   def __init__(self, bot):
     self.bot = bot
 
@@ -11,18 +17,30 @@ class BotModule(object):
   async def on_step(self, iteration):
     raise NotImplementedError("You must implement this function")
 
-  # modules that "claim" units should override these two properties and deallocate method
+  # modules that "claim" units should override the urgency property,
+  # and the deallocate method if they need to know when units are taken by another module
   @property
   def allocated(self):
-    return set()
+    return self.bot.allocations.claimed_by(self)
 
   @property
   def urgency(self):
     return Urgency.NONE
 
+  def claim(self, tags):
+    self.bot.allocations.claim(self, tags, self.urgency)
+
+  def release(self, tags):
+    self.bot.allocations.release(self, tags)
+
   def deallocate(self, tag_set):
     return
 
+  # units whose abilities this module may look up in `shared.abilities` during the next on_step.
+  # every module's candidates are fetched together, before any module runs.
+  def ability_candidates(self):
+    return []
+
   # Some other methods that are available
   async def on_start(self):
     self.log = self.bot.log.withFields({ "module": type(self).__name__ })
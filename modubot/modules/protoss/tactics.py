@@ -17,30 +17,43 @@ class ProtossMicro(BotModule):
     await self.arrange()
     return
 
-  async def arrange(self):
-    stalkers = self.units(UnitTypeId.STALKER)
-    sentries = self.units(UnitTypeId.SENTRY)
+  def threatened_stalkers(self):
+    spatial = self.shared.spatial
+    units = self.shared.snapshot.units
+    stalkers = units.select(units.of_type(UnitTypeId.STALKER) & (units.shield < 20))
+    return stalkers.filter(lambda s: spatial.enemy_units.closer_than(5, s.position).exists)
+
+  def sentries_near_ranged_attackers(self):
+    spatial = self.shared.spatial
+    units = self.shared.snapshot.units
+    sentries = units.select(units.of_type(UnitTypeId.SENTRY))
+    return sentries.filter(lambda s: spatial.enemy_units.closer_than(12, s.position).filter(lambda e: e.ground_range > 2))
+
+  def has_stalkers(self):
+    return self.shared.snapshot.units.of_type(UnitTypeId.STALKER).any()
+
+  def ability_candidates(self):
+    if not self.has_stalkers():
+      return []
+    return self.threatened_stalkers() + self.sentries_near_ranged_attackers()
 
-    if stalkers.empty:
+  async def arrange(self):
+    if not self.has_stalkers():
       return
-    stalkers_with_low_shields = stalkers.filter(lambda s: s.shield < 20)
-    sentries_near_ranged_attackers = sentries.filter(lambda s: self.enemy_units.filter(lambda e: e.ground_range > 2).closer_than(12, s.position))
-    for stalker in stalkers_with_low_shields:
-      if any(enemy.position.is_closer_than(5, stalker.position) for enemy in self.enemy_units):
-        def distance_to_stalker(unit):
-          return unit.position.distance_to(stalker.position)
-        nearest_enemy = min(self.enemy_units, key=distance_to_stalker)
-        abilities = await self.get_available_abilities(stalker)
-
-        if AbilityId.EFFECT_BLINK_STALKER in abilities:
-          self.do(stalker(AbilityId.EFFECT_BLINK_STALKER, stalker.position.towards(nearest_enemy.position, -5)))
-        else:
-          self.do(stalker.move(stalker.position.towards(nearest_enemy, -3)))
-
-        self.do(stalker.attack(nearest_enemy.position, queue=True))
-
-    for sentry in sentries_near_ranged_attackers:
-      abilities = await self.get_available_abilities(sentry)
+    spatial = self.shared.spatial
+    for stalker in self.threatened_stalkers():
+      nearest_enemy = spatial.enemy_units.closest_to(stalker.position)
+      abilities = await self.shared.abilities.get(stalker)
+
+      if AbilityId.EFFECT_BLINK_STALKER in abilities:
+        self.do(stalker(AbilityId.EFFECT_BLINK_STALKER, stalker.position.towards(nearest_enemy.position, -5)))
+      else:
+        self.do(stalker.move(stalker.position.towards(nearest_enemy, -3)))
+
+      self.do(stalker.attack(nearest_enemy.position, queue=True))
+
+    for sentry in self.sentries_near_ranged_attackers():
+      abilities = await self.shared.abilities.get(sentry)
       if AbilityId.GUARDIANSHIELD_GUARDIANSHIELD in abilities:
         self.do(sentry(AbilityId.GUARDIANSHIELD_GUARDIANSHIELD))
       if sentry.shield < sentry.shield_max * 0.9:
@@ -51,5 +64,5 @@ class ProtossMicro(BotModule):
     for effect in self.state.effects:
       if effect.id in [EffectId.PSISTORMPERSISTENT, EffectId.RAVAGERCORROSIVEBILECP]:
         for position in effect.positions:
-          for unit in self.units.closer_than(4, position):
+          for unit in spatial.units.closer_than(4, position):
             self.do(unit.move(unit.position.towards(position, -2)))
@@ -12,10 +12,12 @@ class RallyPointer(BotModule):
     if not self.shared.rally_point:
       return
 
-    for unit in self.unallocated().further_than(15, self.shared.rally_point):
+    spatial = self.shared.spatial
+    distant_units = spatial.units.further_than(15, self.shared.rally_point).tags
+    for unit in self.unallocated().tags_in(distant_units):
       self.do(retreat(unit, self.shared.rally_point))
 
-    destructables = self.destructables.filter(lambda d: d.position.is_closer_than(10, self.shared.rally_point))
+    destructables = spatial.destructables.closer_than(10, self.shared.rally_point)
     if destructables.exists:
       for unit in self.unallocated().idle:
         self.do(unit.attack(destructables.first))
@@ -24,8 +26,13 @@ class RallyPointer(BotModule):
     if self.townhalls.empty or self.townhalls.amount == 1:
       return list(self.main_base_ramp.upper)[0]
 
+    ground_distances = self.shared.ground_distances
+    front = self.bases_centroid().towards(self.game_info.map_center, 20)
     def distance_to_bases(ramp):
-      return ramp.top_center.distance_to(self.bases_centroid().towards(self.game_info.map_center, 20))
+      # ramp tops are searched from at the start, so this doesn't search from `front`, which moves with every new base
+      return ground_distances.distance(ramp.top_center, front)
 
+    # the closest ramp that isn't under enemy fire, if there is one
     ramps = sorted(self.game_info.map_ramps, key=distance_to_bases)
-    return list(ramps[0].upper)[0]
+    safe_ramps = [ r for r in ramps if not self.shared.threat_map.in_danger(r.top_center) ]
+    return list((safe_ramps or ramps)[0].upper)[0]
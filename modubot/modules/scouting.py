@@ -6,7 +6,6 @@ from sc2 import Race
 from sc2.constants import *
 from sc2.dicts.unit_trained_from import UNIT_TRAINED_FROM
 from sc2.position import Point2
-from sc2.units import Units
 
 from modubot.common import Urgency, BuildRequest, BaseStructures, list_diff, list_flatten
 from modubot.modules.module import BotModule
@@ -42,12 +41,6 @@ class ScoutManager(BotModule):
     requests = self.request_needed_units()
     return requests
 
-  @property
-  def allocated(self):
-    return { mission.unit.tag
-             for mission in self.missions
-             if mission.unit and mission.status == ScoutingMissionStatus.ACTIVE }
-
   @property
   def urgency(self):
     return Urgency.MEDIUMHIGH
@@ -60,6 +53,8 @@ class ScoutManager(BotModule):
   def get_scout(self, mission):
     if mission.unit:
       scouts = self.bot.units.tags_in([ mission.unit.tag ])
+      if scouts.empty:
+        self.release({ mission.unit.tag })
       mission.unit = scouts.first if scouts.exists else None
 
     for unit_type in mission.unit_priority:
@@ -77,14 +72,16 @@ class ScoutManager(BotModule):
           self.release_scout(mission.unit)
         self.log.info(f"Assigning {unit_type} to {type(mission).__name__}")
         mission.unit = available_units.closest_to(mission.targets[0])
+        self.claim({ mission.unit.tag })
         break
 
     return mission.unit
 
   def release_scout(self, scout):
+    self.release({ scout.tag })
     if scout.type_id == self.shared.common_worker:
       self.log.debug("Releasing worker")
-      mineral_field = self.mineral_field.filter(lambda f: any(th.position.is_closer_than(15, f.position) for th in self.townhalls))
+      mineral_field = self.shared.spatial.mineral_field.closer_than_any(15, [ th.position for th in self.townhalls ])
       if mineral_field.exists:
         self.do(scout.gather(mineral_field.random))
     else:
@@ -132,16 +129,16 @@ class ScoutManager(BotModule):
       target = mission.targets[0]
       danger = self.find_danger(scout, bonus_range=3)
       # things to do only when there are -- or aren't -- enemies
-      if danger.exists:
+      if danger:
         now = self.time
         scout = self.units.tags_in([ mission.unit.tag ]).first
         if scout.is_flying:
-          target = scout.position.towards(danger.center, -2)
+          target = self.shared.threat_map.safe_step(scout, scout.position, distance=2)
         else:
           target = self.shared.rally_point
 
         if scout.type_id == UnitTypeId.ADEPT:
-          abilities = await self.get_available_abilities(scout)
+          abilities = await self.shared.abilities.get(scout)
           if AbilityId.ADEPTPHASESHIFT_ADEPTPHASESHIFT in abilities:
             self.do(scout(AbilityId.ADEPTPHASESHIFT_ADEPTPHASESHIFT, scout.position))
             mission.retreat_until = now + 13
@@ -155,7 +152,7 @@ class ScoutManager(BotModule):
         # at this point, the timer is only for the purpose of whether to give up on the current target
         mission.retreat_until = max(mission.retreat_until, now) if mission.retreat_until else now
 
-      if danger.empty and mission.retreat_until and mission.retreat_until >= now:
+      if not danger and mission.retreat_until and mission.retreat_until >= now:
         target = None
 
       if target:
@@ -166,11 +163,10 @@ class ScoutManager(BotModule):
   def find_danger(self, scout, bonus_range=1):
     if scout.type_id == UnitTypeId.ADEPTPHASESHIFT:
       # I ain't afraid
-      return Units([], self)
+      return False
 
-    enemies = self.enemy_units + self.enemy_structures
-    enemies_that_could_hit_scout = enemies.filter(lambda e: (e.ground_dps > 5 or e.air_dps > 5) and e.target_in_range(scout, bonus_distance=bonus_range))
-    return enemies_that_could_hit_scout
+    # whether any enemy could hit the scout if it came `bonus_range` closer
+    return self.shared.threat_map.in_danger(scout.position_tuple, scout.radius + bonus_range, air=scout.is_flying)
 
   def request_needed_units(self):
     requests = []
@@ -5,6 +5,8 @@ from .module import BotModule
 from modubot.common import ResearchRequest
 
 class Upgrader(BotModule):
+  budget = 1
+
   def __init__(self, bot, upgrade_sets=dict()):
     super().__init__(bot)
     self.upgrade_sets = upgrade_sets
@@ -1,33 +1,71 @@
-from sc2.constants import UnitTypeId, BuffId, AbilityId
+from sc2.constants import UnitTypeId, AbilityId
 
 from modubot.common import BuildRequest, Urgency
 from modubot.modules.module import BotModule
 
+_TUMOR_TYPES = { UnitTypeId.CREEPTUMOR, UnitTypeId.CREEPTUMORBURROWED, UnitTypeId.CREEPTUMORQUEEN }
+
+# roughly how long after it finishes a tumor can spread; each tumor is checked with an ability query after this long
+_SPREAD_DELAY = 11
+# how often a tumor that couldn't spread yet is checked again, and when to stop (it must have spread already)
+_RECHECK_INTERVAL = 2
+_GIVE_UP_AFTER = 30
+
 class CreepSpreader(BotModule):
   def __init__(self, bot):
     super().__init__(bot)
+    # tumors that can spread; the BuildRequest moves them to ordered_tumors once they're ordered to
     bot.shared.unused_tumors = set()
-    self.last_tumor_check = 0
+    bot.shared.ordered_tumors = set()
+    # tumors that haven't been able to spread yet: tag -> (game time to check next, game time to give up)
+    self.waiting_tumors = dict()
+
+  async def on_building_construction_complete(self, unit):
+    if unit.type_id in _TUMOR_TYPES:
+      self.waiting_tumors[unit.tag] = (self.time + _SPREAD_DELAY, self.time + _SPREAD_DELAY + _GIVE_UP_AFTER)
+
+  async def on_unit_destroyed(self, tag):
+    self.waiting_tumors.pop(tag, None)
+    self.shared.unused_tumors.discard(tag)
+    self.shared.ordered_tumors.discard(tag)
+
+  def tumors_due(self):
+    return self.structures.tags_in({ tag for (tag, (due, _)) in self.waiting_tumors.items() if due <= self.time })
+
+  def ability_candidates(self):
+    return self.tumors_due()
 
   async def on_step(self, iteration):
-    if self.time - self.last_tumor_check > 5:
-      self.last_tumor_check = self.time
-      await self.find_unused_tumors()
+    self.recheck_tumors()
+    await self.find_unused_tumors()
 
     if self.shared.unused_tumors:
       return [ BuildRequest(UnitTypeId.CREEPTUMOR, Urgency.HIGH) ]
 
-    ready_queens = self.units(UnitTypeId.QUEEN).idle.filter(lambda q: q.energy > 40)
+    ready_queens = self.shared.views.queens.idle.filter(lambda q: q.energy > 40)
     engorged_queens = ready_queens.filter(lambda q: q.energy > 180)
     if engorged_queens.exists or (ready_queens.exists and len(self.shared.unused_tumors) < 5):
       return [ BuildRequest(UnitTypeId.CREEPTUMOR, Urgency.HIGH) ]
 
+  def recheck_tumors(self):
+    # Tumors still unused from the last step got no target: they wait to be checked again like any other.
+    # Ordered ones are checked once more, in case the order didn't go through, and dropped if they're spent.
+    for tag in self.shared.unused_tumors:
+      self.waiting_tumors[tag] = (self.time + _RECHECK_INTERVAL, self.time + _GIVE_UP_AFTER)
+    for tag in self.shared.ordered_tumors:
+      self.waiting_tumors[tag] = (self.time + _RECHECK_INTERVAL, self.time + _RECHECK_INTERVAL)
+    self.shared.unused_tumors.clear()
+    self.shared.ordered_tumors.clear()
+
   async def find_unused_tumors(self):
-    all_tumors = self.structures(UnitTypeId.CREEPTUMORBURROWED)
-    for tumor in all_tumors:
-      abilities = await self.get_available_abilities(tumor)
+    due_tumors = self.tumors_due()
+    if due_tumors.empty:
+      return
+    await self.shared.abilities.prefetch(due_tumors)
+    for tumor in due_tumors:
+      abilities = await self.shared.abilities.get(tumor)
+      (_, give_up) = self.waiting_tumors.pop(tumor.tag)
       if AbilityId.BUILD_CREEPTUMOR_TUMOR in abilities:
         self.shared.unused_tumors.add(tumor.tag)
-      else:
-        # this should be handled by the planner -- but, just in case
-        self.shared.unused_tumors.discard(tumor.tag)
+      elif self.time < give_up:
+        self.waiting_tumors[tumor.tag] = (self.time + _RECHECK_INTERVAL, give_up)
@@ -6,23 +6,15 @@ from modubot.modules.module import BotModule
 class LarvaInjector(BotModule):
   def __init__(self, bot):
     super().__init__(bot)
-    self.queens = set()
-
-  @property
-  def allocated(self):
-    return self.queens
 
   @property
   def urgency(self):
     return Urgency.HIGH
 
-  def deallocate(self, tag_set):
-    self.queens.difference_update(tag_set)
-
   async def on_step(self, iteration):
     requests = []
-    self.queens = self.queens.union({ q.tag for q in self.unallocated(UnitTypeId.QUEEN, self.urgency) })
-    queens = self.units(UnitTypeId.QUEEN)
+    self.claim(q.tag for q in self.unallocated(UnitTypeId.QUEEN, self.urgency))
+    queens = self.shared.views.queens
 
     bases = self.townhalls
     queen_urgency = Urgency.NONE
@@ -34,16 +26,16 @@ class LarvaInjector(BotModule):
 
     requests.append(BuildRequest(UnitTypeId.QUEEN, queen_urgency))
 
-    ready_queens = self.units.tags_in(self.queens).filter(lambda q:
+    ready_queens = self.units.tags_in(self.allocated).filter(lambda q:
       q.energy >= 25 and not q.is_using_ability({
         AbilityId.EFFECT_INJECTLARVA,
         AbilityId.BUILD_CREEPTUMOR_QUEEN
       })
     )
 
-    busy_queens = self.units(UnitTypeId.QUEEN).filter(lambda q: not q.is_idle)
+    busy_queens = queens.filter(lambda q: not q.is_idle)
 
-    needy_bases = self.townhalls.ready.filter(lambda s:
+    needy_bases = self.shared.views.ready_townhalls.filter(lambda s:
       not s.has_buff(BuffId.QUEENSPAWNLARVATIMER) and busy_queens.filter(lambda q: q.orders[0].target == s.tag).empty)
 
     for i in range(min(needy_bases.amount, ready_queens.amount)):
@@ -27,7 +27,7 @@ class ZergMicro(BotModule):
     for effect in self.state.effects:
       if effect.id == EffectId.PSISTORMPERSISTENT:
         for position in effect.positions:
-          for unit in self.units.closer_than(4, position):
+          for unit in self.shared.spatial.units.closer_than(4, position):
             self.do(unit.move(unit.position.towards(position, -2)))
 
     if self.shared.burrow_researched:
@@ -48,12 +48,13 @@ class ZergMicro(BotModule):
     if wounded_units.empty:
       return
 
-    healable_units = wounded_units.filter(lambda u: self.units.filter(lambda ally: ally.energy >= 50 and ally.type_id == UnitTypeId.QUEEN).closer_than(5, u).exists)
+    queens = self.shared.views.queens.filter(lambda q: q.energy >= 50)
+    healable_units = wounded_units.filter(lambda u: queens.closer_than(5, u).exists)
     if healable_units.empty:
       return
 
     for healable_unit in healable_units:
-      queen = self.units.filter(lambda ally: ally.energy >= 50 and ally.type_id == UnitTypeId.QUEEN).closer_than(5, healable_unit)
+      queen = queens.closer_than(5, healable_unit)
       if queen.exists:
         selected_queen = queen.first
         if selected_queen.is_idle or selected_queen.orders[0].ability.id != AbilityId.TRANSFUSION_TRANSFUSION:
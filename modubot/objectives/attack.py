@@ -3,8 +3,9 @@ import itertools
 from sc2.constants import UnitTypeId
 from sc2.position import Point2
 
-from modubot.common import Urgency, optimism, is_worker, median_position, supply_cost
+from modubot.common import Urgency, is_worker, median_position, supply_cost
 from modubot.objectives.objective import StrategicObjective, ObjectiveStatus
+from modubot.objectives.proximity import closer_than_matrix
 
 class AttackObjective(StrategicObjective):
   def __init__(self, module, target, urgency=Urgency.MEDIUM, rendezvous=None):
@@ -19,7 +20,7 @@ class AttackObjective(StrategicObjective):
     #everyone...! but no less supply than we know we'll be facing
     return max(
       sum(supply_cost(u) for u in enemy_units),
-      sum(supply_cost(u) for u in (self.units.tags_in(self.allocated) + self.unallocated(urgency=self.urgency).filter(lambda u: not is_worker(u))))
+      sum(supply_cost(u) for u in (self.units.tags_in(self.allocated) + self.unallocated(urgency=self.urgency)))
     )
 
   def optimum_supply(self, enemy_units):
@@ -35,7 +36,7 @@ class AttackObjective(StrategicObjective):
   def stage(self):
     allocated_units = self.units
 
-    if optimism(allocated_units, self.enemies) > 2.5:
+    if self.shared.combat.optimism(allocated_units, self.enemies) > 2.5:
       for attacking_unit in allocated_units:
         self.do(attacking_unit.attack(self.target.position))
       self.log.info("Upgrading to active due to apparent overwhelming advantage")
@@ -59,14 +60,15 @@ class AttackObjective(StrategicObjective):
           self.retreat_unit(attacking_unit, middle)
         return
 
-      for attacking_unit in allocated_units:
-        nearby_enemies = self.enemies.filter(lambda e: e.position.is_closer_than(12, attacking_unit))
-        if nearby_enemies.amount > 1:
-          front_units = allocated_units.filter(lambda friendly: self.enemies.filter(lambda e: e.position.is_closer_than(12, friendly)).exists)
+      # nearby_enemies[i] counts the enemies within 12 of allocated_units[i]
+      nearby_enemies = closer_than_matrix(12, allocated_units, self.enemies).sum(axis=1)
+      front_units = allocated_units.subgroup(u for (u, count) in zip(allocated_units, nearby_enemies) if count)
+      for (attacking_unit, nearby_enemy_count) in zip(allocated_units, nearby_enemies):
+        if nearby_enemy_count > 1:
           next_units = allocated_units.tags_not_in(u.tag for u in front_units)
           next_unit = next_units.closest_to(front_units.center) if next_units.exists else front_units.random
           self.rendezvous = next_unit.position
-        elif nearby_enemies.exists and attacking_unit.position.is_further_than(15, middle):
+        elif nearby_enemy_count and attacking_unit.position.is_further_than(15, middle):
           self.retreat_unit(attacking_unit, middle)
         else:
           self.do(attacking_unit.attack(self.target.position))
@@ -112,9 +114,6 @@ class AttackObjective(StrategicObjective):
 
     return completed
 
-  def do_attack(self, unit):
-    targets = self.enemy_units + self.enemy_structures
-    if targets.exists:
-      self.do(unit.attack(targets.closest_to(self.target).position))
-    else:
-      self.do(unit.attack(self.target))
+  def attack_point(self):
+    closest = self.shared.snapshot.enemies.closest_to(self.target)
+    return closest.position if closest else self.target
@@ -1,7 +1,7 @@
 from sc2.constants import UnitTypeId
 from sc2.units import Units
 
-from modubot.common import Urgency, optimism, supply_cost
+from modubot.common import Urgency, supply_cost
 
 from modubot.objectives.objective import StrategicObjective, ObjectiveStatus
 
@@ -18,23 +18,21 @@ class DefenseObjective(StrategicObjective):
   def allocate(self):
     super().allocate()
     # get workers if needed
-    mission_optimism = optimism(self.units, self.enemies)
+    mission_optimism = self.shared.combat.optimism(self.units, self.enemies)
     if mission_optimism < 1 and self.enemies.amount > 3 and any(not e.is_flying for e in self.enemies):
       nearby_workers = self.unallocated(self.shared.worker_types).closer_than(20, self.enemies.center)
       if nearby_workers.exists:
-        adding_units = set(worker.tag for worker in nearby_workers)
-        self.deallocate(adding_units)
-        self.allocated = self.allocated.union(adding_units)
+        self.module.claim(worker.tag for worker in nearby_workers)
         self.units = self.bot.units.tags_in(self.allocated)
     # release units immediately when enemies have left
     # this will allow probes to return to work
     # and army units to be reallocated or brought to rally
     elif self.enemies.empty:
-      self.allocated.clear()
+      self.module.release(self.allocated)
       self.units = Units([], self.bot)
 
     if all(e.is_flying for e in self.enemies):
-      self.deallocate({ u.tag for u in self.units if not u.can_attack_air })
+      self.module.release({ u.tag for u in self.units if not u.can_attack_air })
 
   def is_complete(self):
     completed = super().is_complete()
@@ -47,11 +45,12 @@ class DefenseObjective(StrategicObjective):
     return completed
 
   def find_enemies(self):
-    return Units(self.shared.known_enemy_units.values(), self.bot).filter(lambda u:
-      (self.townhalls.closer_than(15, u.position).exists or
-      self.shared.rally_point.is_closer_than(15, u.position) or
-      self.structures.closer_than(15, u.position).amount > 2)
-    )
+    known_enemies = self.shared.known_enemies
+    rally_point = self.shared.rally_point
+    # near a base or the rally point, or among our other structures
+    nearby = { r.tag for r in known_enemies.near(15, [ th.position for th in self.townhalls ] + ([ rally_point ] if rally_point else [])) }
+    nearby.update(r.tag for r in known_enemies.near(15, [ s.position for s in self.structures ], minimum=3))
+    return known_enemies.units(r for r in known_enemies if r.tag in nearby)
 
   def optimum_supply(self, enemy_units):
     return sum(supply_cost(u) for u in enemy_units) * 3
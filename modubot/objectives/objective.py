@@ -1,5 +1,4 @@
 import enum
-import itertools
 import logging
 import math
 
@@ -7,7 +6,8 @@ from sc2.constants import UnitTypeId
 from sc2.position import Point2
 from sc2.units import Units
 
-from modubot.common import optimism, is_worker, median_position, supply_cost
+from modubot.common import is_worker, median_position, supply_cost
+from modubot.objectives.proximity import near_any
 
 class ObjectiveStatus(enum.IntFlag):
   ALLOCATING = 1,   # Need more units
@@ -21,7 +21,6 @@ class StrategicObjective():
     self.bot = module.bot
     self.status = ObjectiveStatus.ALLOCATING
     self.status_since = self.bot.time
-    self.allocated = set()
     self.urgency = urgency
     self.rendezvous = rendezvous
     self.units = Units([], self.bot)
@@ -32,6 +31,11 @@ class StrategicObjective():
   def __getattr__(self, name):
     return getattr(self.bot, name)
 
+  # units are claimed on behalf of the owning module
+  @property
+  def allocated(self):
+    return self.module.allocated
+
   @property
   def target(self):
     raise NotImplementedError("You must extend this class and provide a target property")
@@ -44,13 +48,13 @@ class StrategicObjective():
         # there probably aren't many but they are clearly interfering with us at this point
         self.log.info(f"objective was active; clearing {self.enemies.amount} tags from known enemies!")
         for enemy_tag in (e.tag for e in self.enemies):
-          self.shared.known_enemy_units.pop(enemy_tag, None)
+          self.shared.known_enemies.forget(enemy_tag)
 
       return True
     return False
 
   def find_enemies(self):
-    return (Units(self.shared.known_enemy_units.values(), self.bot) + self.enemy_structures) \
+    return (self.shared.known_enemies.units() + self.enemy_structures) \
       .filter(lambda u: u.is_visible or not self.is_visible(u.position))
 
   def abort(self):
@@ -58,23 +62,24 @@ class StrategicObjective():
     self.status_since = self.time
 
   async def tick(self):
-    self.log.info({
-      "status": self.status,
-      "num_units": self.units.amount,
-      "num_enemies": self.enemies.amount,
-      "game_time": self.time,
-    })
-    self.enemies = self.find_enemies()
-    if self.enemy_units.tags_in(e.tag for e in self.enemies).exists:
-      self.last_seen = self.time
-    if self.status >= ObjectiveStatus.ALLOCATING:
-      self.allocate()
-    if self.status == ObjectiveStatus.STAGING:
-      self.stage()
-    if self.status == ObjectiveStatus.ACTIVE:
-      await self.micro()
-    if self.status == ObjectiveStatus.RETREATING:
-      await self.retreat()
+    with self.profiler.measure("objective", type(self).__name__):
+      self.log.info({
+        "status": self.status,
+        "num_units": self.units.amount,
+        "num_enemies": self.enemies.amount,
+        "game_time": self.time,
+      })
+      self.enemies = self.find_enemies()
+      if self.enemy_units.tags_in(e.tag for e in self.enemies).exists:
+        self.last_seen = self.time
+      if self.status >= ObjectiveStatus.ALLOCATING:
+        self.allocate()
+      if self.status == ObjectiveStatus.STAGING:
+        self.stage()
+      if self.status == ObjectiveStatus.ACTIVE:
+        await self.micro()
+      if self.status == ObjectiveStatus.RETREATING:
+        await self.retreat()
 
   # retreat requires implementation in subclasses
   # [ Really tricky on defense. For now, victory or death! ]
@@ -87,6 +92,10 @@ class StrategicObjective():
     self.status_since = self.time
 
   def retreat_unit(self, unit, target):
+    # out of enemy fire first, then on to the target
+    threat_map = self.shared.threat_map
+    if threat_map.in_danger(unit.position_tuple, air=unit.is_flying):
+      target = threat_map.safe_step(unit, target)
     if unit.ground_range >= 5 and unit.weapon_cooldown == 0:
       self.do(unit.attack(target))
     else:
@@ -96,10 +105,12 @@ class StrategicObjective():
     return 0
 
   def optimum_supply(self, enemy_units):
-    return sum(supply_cost(unit) for unit in self.bot.units.filter(lambda u: u.ground_dps + u.air_dps > 5 and not is_worker(u)))
+    units = self.shared.snapshot.units
+    return float(units.supply[(units.dps + units.air_dps > 5) & ~units.worker].sum())
 
-  def do_attack(self, unit):
-    self.do(unit.attack(self.enemies.closest_to(self.target.position).position if self.enemies.exists else self.target.position))
+  def attack_point(self):
+    # where every unit is sent when the attack is renewed
+    return self.enemies.closest_to(self.target.position).position if self.enemies.exists else self.target.position
 
   async def micro(self):
     self.rendezvous = None
@@ -108,8 +119,9 @@ class StrategicObjective():
 
     if self.time - self.status_since > 2:
       self.status_since = self.time
+      point = self.attack_point()
       for unit in self.units:
-        self.do_attack(unit)
+        self.do(unit.attack(point))
 
     near_target_units = self.units.closer_than(15, self.target)
     cooling_down_units = near_target_units.filter(lambda u: u.weapon_cooldown > 0)
@@ -118,15 +130,11 @@ class StrategicObjective():
         self.do(unit.move(unit.position.towards(self.target, 2)))
         self.do(unit.attack(self.target.position, queue=True))
 
-    nearby_enemies = Units(list({
-      enemy_unit
-      for (friendly_unit, enemy_unit) in itertools.product(self.units, self.enemies)
-      if enemy_unit.position.is_closer_than(10, friendly_unit)
-    }), self.bot)
+    nearby_enemies = near_any(10, self.enemies, self.units)
     if nearby_enemies.exists:
       allies_center = median_position([u.position for u in self.units])
       clustered_allies = self.units.closer_than(15, allies_center)
-      if optimism(clustered_allies, self.enemies) < 0.75 and self.supply_used < 180:
+      if self.shared.combat.optimism(clustered_allies, self.enemies) < 0.75 and self.supply_used < 180:
         self.status = ObjectiveStatus.RETREATING
         self.status_since = self.time
     return
@@ -153,11 +161,10 @@ class StrategicObjective():
       # still_wanted is actually supply, not units, so this will over-select for protoss and under-select for zerg
       adding_units = set(unit.tag for unit in preferred_units.closest_n_units(self.target.position, still_wanted))
     elif sum(supply_cost(u) for u in usable_units) >= still_needed:
-      adding_units = set(preferred_units)
+      adding_units = set(unit.tag for unit in preferred_units)
       adding_units.update((unit.tag for unit in usable_units.closest_n_units(self.target.position, still_wanted)))
 
-    self.deallocate(adding_units)
-    self.allocated = self.allocated.union(adding_units)
+    self.module.claim(adding_units)
 
     if sum(supply_cost(u) for u in self.units.tags_in(self.allocated)) >= minimum_supply:
       may_proceed = True
@@ -0,0 +1,29 @@
+import numpy as np
+
+from sc2.units import Units
+
+# Batched distance checks between two groups of units.
+# These replace `itertools.product` loops over `is_closer_than`, with the same (strict) comparison.
+
+def positions(units):
+  return np.array([ u.position_tuple for u in units ], dtype=float).reshape(-1, 2)
+
+def distance_matrix(from_positions, to_positions):
+  offsets = from_positions[:, np.newaxis, :] - to_positions[np.newaxis, :, :]
+  return np.hypot(offsets[:, :, 0], offsets[:, :, 1])
+
+def closer_than_matrix(distance, units, others):
+  # element [i, j] is whether others[j] is closer than `distance` to units[i]
+  return distance_matrix(positions(units), positions(others)) < distance
+
+def any_pair_closer_than(distance, units, others):
+  if not units or not others:
+    return False
+  return bool(closer_than_matrix(distance, units, others).any())
+
+def near_any(distance, units, others):
+  # members of `units` that are closer than `distance` to at least one of `others`, in their original order
+  if not units or not others:
+    return Units([], units._bot_object)
+  near = closer_than_matrix(distance, units, others).any(axis=1)
+  return units.subgroup(unit for (unit, is_near) in zip(units, near) if is_near)
@@ -0,0 +1,72 @@
+import math
+
+import numpy as np
+from scipy.ndimage import distance_transform_edt
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+# Ground distances over the map's pathing grid, shared through `bot.shared.ground_distances`.
+#
+# Cells are joined to their 8 neighbours (diagonals cost sqrt(2)), and a search from a point gives the walking distance
+# from it to every cell. Searches from every expansion location and ramp top are done up front, since most questions are
+# about those; searches from anywhere else are done the first time they're needed and kept for the rest of the game.
+# Points that aren't pathable (an expansion under a town hall, a ramp's edge) are measured from the closest pathable cell.
+# The grid is the one at the start of the game, so structures built later are not taken into account.
+# With a MapCache, the searches from expansions and ramps are saved and reused in later games on the same map.
+class GroundDistances():
+  def __init__(self, game_info, expansions, map_cache=None):
+    pathable = game_info.pathing_grid.data_numpy == 1
+    self.pathable = pathable
+    self.shape = pathable.shape
+    self.cells = np.full(self.shape, -1)
+    self.cells[pathable] = np.arange(pathable.sum())
+    # for every cell, the closest pathable one
+    _, (self.nearest_y, self.nearest_x) = distance_transform_edt(~pathable, return_indices=True)
+
+    self._graph = None
+    self.fields = dict()   # cell number -> distance from it to every cell
+
+    # the searches from expansions and ramps are the same every game on this map
+    sources = map_cache.get("ground_sources") if map_cache else None
+    if sources is not None:
+      self.fields.update(zip(sources.tolist(), map_cache.get("ground_fields")))
+    self.search(list(expansions) + [ ramp.top_center for ramp in game_info.map_ramps ])
+    if map_cache and len(self.fields) != len(sources if sources is not None else ()):
+      map_cache.put("ground_sources", np.array(list(self.fields.keys())))
+      map_cache.put("ground_fields", np.array(list(self.fields.values())))
+
+  @property
+  def graph(self):
+    # only needed for new searches, so it isn't built at all when every search is already cached
+    if self._graph is None:
+      (height, width) = self.shape
+      pathable = self.pathable
+      rows, columns, lengths = [], [], []
+      for (dy, dx, length) in [ (0, 1, 1.0), (1, 0, 1.0), (1, 1, math.sqrt(2)), (1, -1, math.sqrt(2)) ]:
+        here = pathable[max(0, -dy):height - max(0, dy), max(0, -dx):width - max(0, dx)]
+        there = pathable[max(0, dy):height - max(0, -dy), max(0, dx):width - max(0, -dx)]
+        joined = here & there
+        rows.append(self.cells[max(0, -dy):height - max(0, dy), max(0, -dx):width - max(0, dx)][joined])
+        columns.append(self.cells[max(0, dy):height - max(0, -dy), max(0, dx):width - max(0, -dx)][joined])
+        lengths.append(np.full(joined.sum(), length))
+      size = self.cells.max() + 1
+      self._graph = csr_matrix((np.concatenate(lengths), (np.concatenate(rows), np.concatenate(columns))), shape=(size, size))
+    return self._graph
+
+  def cell(self, point):
+    x = min(max(int(point[0]), 0), self.shape[1] - 1)
+    y = min(max(int(point[1]), 0), self.shape[0] - 1)
+    return int(self.cells[self.nearest_y[y, x], self.nearest_x[y, x]])
+
+  def search(self, points):
+    sources = list({ self.cell(p) for p in points } - self.fields.keys())
+    if sources:
+      for (source, field) in zip(sources, dijkstra(self.graph, directed=False, indices=sources)):
+        self.fields[source] = field.astype(np.float32)
+
+  def distance(self, start, end):
+    # walking distance from `start` to `end`, or infinity if there is no way there
+    source = self.cell(start)
+    if source not in self.fields:
+      self.search([ start ])
+    return float(self.fields[source][self.cell(end)])
@@ -0,0 +1,104 @@
+import math
+
+import numpy as np
+from scipy.ndimage import distance_transform_edt
+
+from sc2.constants import UnitTypeId
+from sc2.position import Point2
+
+_TUMOR_TYPES = { UnitTypeId.CREEPTUMOR, UnitTypeId.CREEPTUMORBURROWED, UnitTypeId.CREEPTUMORQUEEN }
+
+# how far a tumor can place the next one
+TUMOR_REACH = 10
+
+# Where creep tumors should go to spread creep furthest.
+#
+# Candidates are cells with creep that a tumor can be placed on, away from expansions (so hatcheries still fit),
+# from the building spots the base planner has set aside, and from other tumors.
+# The best target for a tumor or queen is the candidate within reach that's closest to the edge of the creep,
+# and of those, the furthest from where it is now.
+# Everything that depends on the map is worked out once per step, the first time a target is asked for;
+# after that, each target is a lookup in a small window around the tumor.
+class CreepPlanner():
+  def __init__(self, bot, spacing=4):
+    self.bot = bot
+    self.spacing = spacing
+    self.fixed = bot.game_info.placement_grid.data_numpy == 1
+    clear_near(self.fixed, bot.expansion_locations_list, 3)
+    self.game_loop = None
+
+  def refresh(self, reserved):
+    if self.game_loop == self.bot.state.game_loop:
+      return
+    self.game_loop = self.bot.state.game_loop
+
+    creep = self.bot.state.creep.data_numpy == 1
+    pathable = self.bot.game_info.pathing_grid.data_numpy == 1
+    self.open = self.fixed & creep & pathable
+    tumors = self.bot.structures(_TUMOR_TYPES)
+    clear_near(self.open, [ t.position_tuple for t in tumors ], self.spacing)
+    clear_near(self.open, reserved, 2)
+
+    # creep cells next to ground that creep could still spread to
+    spreadable = pathable & ~creep
+    frontier = np.zeros_like(creep)
+    frontier[1:, :] |= spreadable[:-1, :]
+    frontier[:-1, :] |= spreadable[1:, :]
+    frontier[:, 1:] |= spreadable[:, :-1]
+    frontier[:, :-1] |= spreadable[:, 1:]
+    frontier &= creep
+    self.to_frontier = distance_transform_edt(~frontier) if frontier.any() else np.zeros(creep.shape)
+
+  def best(self, position, reach, candidates):
+    # (score, cell) of the best candidate within `reach` of `position`, lowest score first
+    (x, y) = position
+    (height, width) = candidates.shape
+    top, bottom = max(int(y - reach), 0), min(int(y + reach) + 1, height)
+    left, right = max(int(x - reach), 0), min(int(x + reach) + 1, width)
+    rows, columns = np.mgrid[top:bottom, left:right]
+    from_here = np.hypot(columns + 0.5 - x, rows + 0.5 - y)
+    usable = candidates[top:bottom, left:right] & (from_here <= reach)
+    if not usable.any():
+      return None
+    score = np.where(usable, self.to_frontier[top:bottom, left:right] * reach * 2 - from_here, np.inf)
+    i = np.unravel_index(np.argmin(score), score.shape)
+    return (score[i], (top + i[0], left + i[1]))
+
+  def targets(self, sources, reserved=(), reach=TUMOR_REACH):
+    # the best target for each of `sources` (anything with a position), or None where there isn't one;
+    # targets are kept apart from each other as well as from existing tumors
+    self.refresh(reserved)
+    candidates = self.open.copy()
+    targets = []
+    for source in sources:
+      found = self.best(source.position, reach, candidates)
+      if not found:
+        targets.append(None)
+        continue
+      (y, x) = found[1]
+      target = Point2((x + 0.5, y + 0.5))
+      clear_near(candidates, [ target ], self.spacing)
+      targets.append(target)
+    return targets
+
+  def best_target(self, sources, reserved=(), reach=TUMOR_REACH):
+    # the single best target within reach of any of `sources`
+    self.refresh(reserved)
+    found = [ f for f in (self.best(s.position, reach, self.open) for s in sources) if f ]
+    if not found:
+      return None
+    (y, x) = min(found, key=lambda f: f[0])[1]
+    return Point2((x + 0.5, y + 0.5))
+
+def clear_near(mask, centers, distance):
+  # clears every cell whose centre is within `distance` of any of `centers`
+  for (x, y) in centers:
+    x0 = max(math.ceil(x - distance - 0.5), 0)
+    x1 = min(math.floor(x + distance - 0.5), mask.shape[1] - 1)
+    y0 = max(math.ceil(y - distance - 0.5), 0)
+    y1 = min(math.floor(y + distance - 0.5), mask.shape[0] - 1)
+    if x0 > x1 or y0 > y1:
+      continue
+    xs = np.arange(x0, x1 + 1) + 0.5
+    ys = np.arange(y0, y1 + 1) + 0.5
+    mask[y0:y1 + 1, x0:x1 + 1] &= np.hypot(xs[None, :] - x, ys[:, None] - y) > distance
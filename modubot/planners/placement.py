@@ -0,0 +1,61 @@
+import math
+
+import numpy as np
+
+# Where the base planners may put structures, worked out once per map.
+#
+# The planners test template points that sit on whole or half coordinates, so the mask is kept at half-cell resolution:
+# point (x, y) is mask[y * 2, x * 2]. A point is open when
+# - the cell under it (its coordinates floored, as in_placement_grid does) is in the placement grid
+# - no ramp point, mineral field or geyser is within 1.0 of it
+# Terrain height is kept alongside, so a template can be held to the height of its base.
+# The map doesn't change, so only the resource layer is ever redone: when minerals are mined out or a geyser is taken.
+# With a MapCache, the rest is saved and reused in later games on the same map.
+class PlacementGrid():
+  def __init__(self, game_info, map_cache=None):
+    placement = game_info.placement_grid.data_numpy
+    terrain = game_info.terrain_height.data_numpy
+    (height, width) = placement.shape
+    cells = np.ix_(np.arange(height * 2) // 2, np.arange(width * 2) // 2)
+
+    self.heights = terrain[cells].astype(int)
+    self.fixed = map_cache.get("placement_fixed") if map_cache else None
+    if self.fixed is None:
+      self.fixed = placement[cells] == 1
+      exclude_near(self.fixed, [ point for ramp in game_info.map_ramps for point in ramp.points ], 1.0)
+      if map_cache:
+        map_cache.put("placement_fixed", self.fixed)
+    self.resources = None
+    self.open = self.fixed
+
+  def update_resources(self, positions):
+    positions = frozenset(positions)
+    if positions != self.resources:
+      self.resources = positions
+      self.open = self.fixed.copy()
+      exclude_near(self.open, positions, 1.0)
+
+  def fits(self, locations, offsets, desired_height):
+    # for each location: whether every point of the footprint (location + offset) is open and at `desired_height`
+    if not locations:
+      return np.ones(0, dtype=bool)
+    points = np.array(locations)[:, None, :] + np.array(offsets)[None, :, :]
+    x = np.rint(points[..., 0] * 2).astype(int)
+    y = np.rint(points[..., 1] * 2).astype(int)
+    inside = (x >= 0) & (y >= 0) & (x < self.open.shape[1]) & (y < self.open.shape[0])
+    x = np.clip(x, 0, self.open.shape[1] - 1)
+    y = np.clip(y, 0, self.open.shape[0] - 1)
+    return (inside & self.open[y, x] & (np.abs(self.heights[y, x] - desired_height) < 0.5)).all(axis=1)
+
+def exclude_near(mask, centers, distance):
+  # clears every half-cell point within `distance` of any of `centers`
+  for (x, y) in centers:
+    x0 = max(math.ceil((x - distance) * 2), 0)
+    x1 = min(math.floor((x + distance) * 2), mask.shape[1] - 1)
+    y0 = max(math.ceil((y - distance) * 2), 0)
+    y1 = min(math.floor((y + distance) * 2), mask.shape[0] - 1)
+    if x0 > x1 or y0 > y1:
+      continue
+    xs = np.arange(x0, x1 + 1) / 2
+    ys = np.arange(y0, y1 + 1) / 2
+    mask[y0:y1 + 1, x0:x1 + 1] &= np.hypot(xs[None, :] - x, ys[:, None] - y) > distance
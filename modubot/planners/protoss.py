@@ -2,7 +2,7 @@ import random
 
 from sc2.position import Point2
 from sc2.constants import UnitTypeId
-from modubot.common import BasePlanner, list_flatten
+from modubot.common import BasePlanner
 
 _2X2_OFFSETS = [
   Point2([0, 0]),
@@ -85,6 +85,8 @@ god_pylons = [ mutate(Point2([ 5.5, 4.5 ])) for mutate in mutators ]
 
 class ProtossBasePlan():
   def __init__(self):
+    # god pylons are kept apart, so they can be built first - minimizes POOR PLANNING issues, and gives all bases pylons
+    self.god_pylon_positions = []
     self.pylon_positions = []
     self.structure_positions = []
 
@@ -96,11 +98,10 @@ class ProtossBasePlanner(BasePlanner):
   async def increase_buildable_area(self, workers):
     if not self.already_pending(UnitTypeId.PYLON):
       targets = self.planner.get_available_positions(UnitTypeId.PYLON)
-      for location in targets:
-        can_build = await self.can_place_single(UnitTypeId.PYLON, location)
-        if can_build:
-          self.log.warning("Force-built pylon.")
-          return workers.closest_to(location).build(UnitTypeId.PYLON, location)
+      location = await self.first_placeable(UnitTypeId.PYLON, targets)
+      if location:
+        self.log.warning("Force-built pylon.")
+        return workers.closest_to(location).build(UnitTypeId.PYLON, location)
       self.log.warning("Failed to force-build pylon.")
     else:
       self.log.info("Pylon already pending.")
@@ -108,27 +109,24 @@ class ProtossBasePlanner(BasePlanner):
   def may_place(self, structure_type):
     return self.structures(UnitTypeId.PYLON).ready.exists or structure_type in [UnitTypeId.PYLON, UnitTypeId.NEXUS]
 
-  def can_place_pylon(self, location, desired_height):
-    resources = [ g.position for g in (self.vespene_geyser + self.mineral_field) ]
-    ramps = self.game_info.map_ramps
-    return all(self.in_placement_grid(pos) and abs(self.get_terrain_height(pos) - desired_height) < 0.5 and all(r.is_further_than(1.0, pos) for r in resources) and all(all(point.is_further_than(1.0, pos) for point in r.points) for r in ramps) for pos in [ offset + location for offset in _2X2_OFFSETS ])
-
-  def can_place_structure(self, location, desired_height):
-    resources = [ g.position for g in (self.vespene_geyser + self.mineral_field) ]
-    ramps = self.game_info.map_ramps
-    return all(self.in_placement_grid(pos) and abs(self.get_terrain_height(pos) - desired_height) < 0.5 and all(r.is_further_than(1.0, pos) for r in resources) and all(all(point.is_further_than(1.0, pos) for point in r.points) for r in ramps) for pos in [ offset + location for offset in _3X3_OFFSETS ])
-
   def initialize_plans(self, base):
     self.log.info("Creating building plan for base")
 
     plan = ProtossBasePlan()
     base_terrain_height = self.get_terrain_height(base.position)
+    self.placement.update_resources(r.position for r in self.vespene_geyser + self.mineral_field)
     for mutate in mutators:
       for i in range(len(pylon_positions)):
-        if all(self.can_place_pylon(mutate(pos) + base.position, base_terrain_height) for pos in pylon_positions[i]) and \
-           all(self.can_place_structure(mutate(pos, 3) + base.position, base_terrain_height) for pos in structure_positions[i]):
-          plan.pylon_positions += [ mutate(pos) + base.position for pos in pylon_positions[i]]
-          plan.structure_positions += [ mutate(pos, 3) + base.position for pos in structure_positions[i]]
+        pylons = [ mutate(pos) + base.position for pos in pylon_positions[i] ]
+        structures = [ mutate(pos, 3) + base.position for pos in structure_positions[i] ]
+        if self.placement.fits(pylons, _2X2_OFFSETS, base_terrain_height).all() and \
+           self.placement.fits(structures, _3X3_OFFSETS, base_terrain_height).all():
+          for pylon in pylons:
+            if pylon - base.position in god_pylons:
+              plan.god_pylon_positions.append(pylon)
+            else:
+              plan.pylon_positions.append(pylon)
+          plan.structure_positions += structures
 
     return plan
 
@@ -136,29 +134,18 @@ class ProtossBasePlanner(BasePlanner):
     if structure_type == UnitTypeId.NEXUS:
       # We don't build it like this.
       return []
-    for nex_tag in list(self.plans.keys()):
-      if nex_tag not in [ nex.tag for nex in self.townhalls ]:
-        del self.plans[nex_tag]
-    for nex in self.townhalls:
-      if nex.tag not in self.plans:
-        self.plans[nex.tag] = self.initialize_plans(nex)
     if structure_type == UnitTypeId.PYLON:
       return self._get_pylon_positions()
     else:
       return self._get_non_pylon_positions(near)
 
   def _get_pylon_positions(self):
-    base_locations = [ nex.position for nex in self.townhalls ]
-    existing_pylons = [ pylon.position for pylon in self.structures(UnitTypeId.PYLON) ]
-    acceptable_positions = [ p for p in list_flatten([ p.pylon_positions for p in self.plans.values() ]) if p not in existing_pylons ]
-
-    random.shuffle(acceptable_positions)
-    # Move god pylons to the front - minimizes POOR PLANNING issues, and gives all bases pylons
-    for i in range(len(acceptable_positions)):
-      if any(acceptable_positions[i] - base_location in god_pylons for base_location in base_locations):
-        acceptable_positions.insert(0, acceptable_positions.pop(i))
-    return [p for p in acceptable_positions if not self.structures.closer_than(1.0, p).exists]
+    god_pylons = self.slots.free('god_pylon_positions')
+    pylons = self.slots.free('pylon_positions')
+    random.shuffle(god_pylons)
+    random.shuffle(pylons)
+    return god_pylons + pylons
 
   def _get_non_pylon_positions(self, near):
-    acceptable_positions = self.plans[near.tag].structure_positions if near else list_flatten([ p.structure_positions for p in self.plans.values() ])
-    return [ p for p in acceptable_positions if self.state.psionic_matrix.covers(p) and not self.structures.closer_than(1.0, p).exists ]
+    acceptable_positions = self.slots.free('structure_positions', [ near.tag ] if near else None)
+    return [ p for p in acceptable_positions if self.state.psionic_matrix.covers(p) ]
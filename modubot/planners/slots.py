@@ -0,0 +1,60 @@
+import math
+
+# Which of the planned structure positions are free, for each base with a plan.
+#
+# A base's slots are its plan's position lists, by attribute name (`pylon_positions`, `large_positions` ...).
+# A slot is taken while one of our structures stands within 1.0 of it. The planner keeps that up to date from
+# construction and destruction events, so listing free slots doesn't look at any structures.
+class StructureSlots():
+  def __init__(self):
+    self.bases = dict()       # base tag -> { kind -> [ position ] }
+    self.cells = dict()       # (x, y) rounded to half cells -> { position }
+    self.taken = dict()       # position -> { tags of structures on it }
+    self.occupants = dict()   # structure tag -> { positions it takes }
+
+  def add_base(self, tag, plan, structures):
+    self.bases[tag] = { kind: list(dict.fromkeys(positions)) for (kind, positions) in vars(plan).items() }
+    for positions in self.bases[tag].values():
+      for p in positions:
+        self.cells.setdefault(_cell(p), set()).add(p)
+    for structure in structures:
+      self.occupy(structure.tag, structure.position)
+
+  def remove_base(self, tag):
+    if self.bases.pop(tag, None) is None:
+      return
+    planned = { p for kinds in self.bases.values() for positions in kinds.values() for p in positions }
+    self.cells = dict()
+    for p in planned:
+      self.cells.setdefault(_cell(p), set()).add(p)
+    for p in list(self.taken):
+      if p not in planned:
+        del self.taken[p]
+
+  def occupy(self, tag, position):
+    (x, y) = _cell(position)
+    for dx in range(-2, 3):
+      for dy in range(-2, 3):
+        for p in self.cells.get((x + dx, y + dy), ()):
+          if position.distance_to_point2(p) < 1.0:
+            self.taken.setdefault(p, set()).add(tag)
+            self.occupants.setdefault(tag, set()).add(p)
+
+  def release(self, tag):
+    for p in self.occupants.pop(tag, ()):
+      tags = self.taken.get(p)
+      if tags:
+        tags.discard(tag)
+        if not tags:
+          del self.taken[p]
+
+  def free(self, kind, bases=None):
+    # free slots of `kind` at `bases` (tags), or at every base
+    plans = (self.bases[b] for b in bases if b in self.bases) if bases is not None else self.bases.values()
+    return [ p for plan in plans for p in plan[kind] if p not in self.taken ]
+
+  def planned(self, kind):
+    return [ p for plan in self.bases.values() for p in plan[kind] ]
+
+def _cell(position):
+  return (math.floor(position[0] * 2), math.floor(position[1] * 2))
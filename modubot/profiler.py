@@ -0,0 +1,66 @@
+import contextlib
+import logging
+import time
+
+import numpy as np
+
+PERCENTILES = [ 50, 90, 99 ]
+
+# Wall and CPU time spent in each part of a step, reported as percentiles every `report_every` steps.
+# With `report_every=0` nothing is measured; with `report_every=None` samples are kept until someone asks for them.
+#
+# Sections are named by a category ("step", "module", "objective", "fulfill", "planner", "abilities") and a name within it.
+# CPU time is measured on the game thread only, so the log writer's thread isn't counted against modules.
+# Wall time includes any time spent waiting on the client while the section was awaiting something.
+class StepProfiler():
+  def __init__(self, report_every=100):
+    self.report_every = report_every
+    self.samples = dict()   # (category, name) -> ([wall seconds], [cpu seconds])
+
+  @contextlib.contextmanager
+  def measure(self, category, name):
+    if self.report_every == 0:
+      yield
+      return
+
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    try:
+      yield
+    finally:
+      wall, cpu = self.samples.setdefault((category, name), ([], []))
+      wall.append(time.perf_counter() - wall_start)
+      cpu.append(time.thread_time() - cpu_start)
+
+  def report_due(self, iteration):
+    return bool(self.report_every) and iteration > 0 and iteration % self.report_every == 0
+
+  def summarize(self, seconds):
+    milliseconds = np.array(seconds) * 1000
+    summary = dict(zip(
+      [ f"p{p}_ms" for p in PERCENTILES ],
+      [ round(float(v), 3) for v in np.percentile(milliseconds, PERCENTILES) ],
+    ))
+    summary["max_ms"] = round(float(milliseconds.max()), 3)
+    summary["total_ms"] = round(float(milliseconds.sum()), 3)
+    return summary
+
+  def summaries(self):
+    for ((category, name), (wall, cpu)) in sorted(self.samples.items()):
+      yield {
+        "category": category,
+        "name": name,
+        "samples": len(wall),
+        "wall": self.summarize(wall),
+        "cpu": self.summarize(cpu),
+      }
+
+  def report(self, log, iteration):
+    if log.isEnabledFor(logging.INFO):
+      for timing in self.summaries():
+        log.info({
+          "message": "Step timing",
+          "iteration": iteration,
+          "timing": timing,
+        })
+    self.samples = dict()
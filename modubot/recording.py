@@ -0,0 +1,148 @@
+import gzip
+import struct
+
+from s2clientprotocol import query_pb2 as query_pb
+from s2clientprotocol import sc2api_pb2 as sc_pb
+
+# Observation recordings: everything the game told the bot, so a game can be stepped through again offline.
+#
+# A recording is a gzip stream that starts with MAGIC, followed by entries of
+#   kind (1 byte), payload length (4 bytes, little endian), payload
+# where the payload is a serialized protobuf message (or, for PLAYER, the player id).
+# Game info is only written when it differs from the last copy, since it rarely changes between steps.
+# Queries are written as the request followed by the response, so the answers can be matched up later.
+
+MAGIC = b"MODUREC1"
+
+PLAYER = 0        # player id
+PING = 1          # ResponsePing
+DATA = 2          # ResponseData
+GAME_INFO = 3     # ResponseGameInfo
+OBSERVATION = 4   # ResponseObservation; starts a new frame
+QUERY = 5         # RequestQuery, then ResponseQuery
+
+QUERY_FIELDS = [ 'pathing', 'abilities', 'placements' ]
+
+class RecordingWriter():
+  def __init__(self, filename):
+    self.stream = gzip.open(filename, 'wb')
+    self.stream.write(MAGIC)
+
+  def write(self, kind, payload):
+    self.stream.write(struct.pack('<BI', kind, len(payload)))
+    self.stream.write(payload)
+
+  def close(self):
+    self.stream.close()
+
+def read_entries(filename):
+  # A game that crashed leaves a truncated file behind; everything up to the damage is still usable.
+  with gzip.open(filename, 'rb') as stream:
+    if stream.read(len(MAGIC)) != MAGIC:
+      raise ValueError(f"{filename} is not an observation recording")
+
+    while True:
+      try:
+        header = stream.read(5)
+        if len(header) < 5:
+          return
+        (kind, length) = struct.unpack('<BI', header)
+        payload = stream.read(length)
+      except EOFError:
+        return
+      if len(payload) < length:
+        return
+      yield (kind, payload)
+
+def query_answers(request, response):
+  # individual answers from a query, keyed by the question that was asked
+  answers = dict()
+  for field in QUERY_FIELDS:
+    for (question, answer) in zip(getattr(request, field), getattr(response, field)):
+      answers[(field, request.ignore_resource_requirements, question.SerializeToString())] = answer.SerializeToString()
+  return answers
+
+class Frame():
+  def __init__(self, observation, game_info):
+    self.observation = observation   # serialized ResponseObservation
+    self.game_info = game_info       # serialized ResponseGameInfo
+    self.answers = dict()            # see query_answers
+
+# A recording read back into memory. `entries` are (kind, payload) pairs, as from read_entries.
+class Recording():
+  def __init__(self, entries):
+    self.player_id = None
+    self.ping = None
+    self.data = None
+    self.frames = []
+    game_info = None
+
+    for (kind, payload) in entries:
+      if kind == PLAYER:
+        self.player_id = struct.unpack('<I', payload)[0]
+      elif kind == PING:
+        self.ping = payload
+      elif kind == DATA:
+        self.data = payload
+      elif kind == GAME_INFO:
+        game_info = payload
+        if self.frames:
+          self.frames[-1].game_info = payload
+      elif kind == OBSERVATION:
+        self.frames.append(Frame(payload, game_info))
+      elif kind == QUERY and self.frames:
+        (request_length,) = struct.unpack('<I', payload[:4])
+        request = query_pb.RequestQuery.FromString(payload[4:4 + request_length])
+        response = query_pb.ResponseQuery.FromString(payload[4 + request_length:])
+        self.frames[-1].answers.update(query_answers(request, response))
+
+    if self.player_id is None or self.data is None or not self.frames:
+      raise ValueError("Recording does not contain a complete game start")
+
+def load_recording(filename):
+  return Recording(read_entries(filename))
+
+# Records a game while it is being played.
+# Every request the bot makes goes through `Client._execute`, so that is where the responses are captured.
+class ObservationRecorder():
+  def __init__(self, filename):
+    self.writer = RecordingWriter(filename)
+    self.game_info = None
+
+  async def start(self, bot):
+    # The game was set up (and the first observation taken) before the bot got control,
+    # so the start of the game is asked for again. The answers are the same.
+    client = bot._client
+    execute = client._execute
+
+    self.writer.write(PLAYER, struct.pack('<I', bot.player_id))
+    self.writer.write(PING, (await execute(ping=sc_pb.RequestPing())).ping.SerializeToString())
+    self.writer.write(DATA, (await execute(data=sc_pb.RequestData(
+      ability_id=True, unit_type_id=True, upgrade_id=True, buff_id=True, effect_id=True
+    ))).data.SerializeToString())
+    self.writer.write(OBSERVATION, bot.state.response_observation.SerializeToString())
+    self.record_game_info((await execute(game_info=sc_pb.RequestGameInfo())).game_info)
+
+    client._execute = self.recording(execute)
+
+  def recording(self, execute):
+    async def execute_and_record(**kwargs):
+      response = await execute(**kwargs)
+      if 'observation' in kwargs:
+        self.writer.write(OBSERVATION, response.observation.SerializeToString())
+      elif 'game_info' in kwargs:
+        self.record_game_info(response.game_info)
+      elif 'query' in kwargs:
+        request = kwargs['query'].SerializeToString()
+        self.writer.write(QUERY, struct.pack('<I', len(request)) + request + response.query.SerializeToString())
+      return response
+    return execute_and_record
+
+  def record_game_info(self, game_info):
+    payload = game_info.SerializeToString()
+    if payload != self.game_info:
+      self.writer.write(GAME_INFO, payload)
+      self.game_info = payload
+
+  def close(self):
+    self.writer.close()
@@ -0,0 +1,49 @@
+import time
+
+# Decides which modules run on each step, from the `interval` and `budget` they declare (see BotModule).
+#
+# A module with an interval runs at most once per that many game seconds. Their first runs are spread across the
+# first interval, so modules with the same interval don't all land on the same step.
+# A module with a budget is put off to a later step when running it would take the step past `step_budget` ms,
+# but never by more than its interval (or a second, for modules that run every step), so it can't be starved.
+# A module that's put off keeps the requests it made last time it ran, so the arbiter still sees them; a module that
+# isn't due makes none, since what it asked for then may already be under way.
+class ModuleScheduler():
+  def __init__(self, step_budget):
+    self.step_budget = step_budget
+    self.next_run = dict()   # module -> game time it's next due
+    self.requests = dict()   # module -> requests it returned last time it ran
+    self.step_start = None
+
+  def start_step(self, modules, game_time):
+    self.step_start = time.perf_counter()
+    throttled = [ m for m in modules if m.interval and m not in self.next_run ]
+    for (i, module) in enumerate(throttled):
+      self.next_run[module] = game_time + module.interval * (i + 1) / (len(throttled) + 1)
+
+  def due(self, module, game_time):
+    return game_time >= self.next_run.get(module, 0)
+
+  def should_run(self, module, game_time):
+    if not self.due(module, game_time):
+      return False
+    if module.budget is None or not self.step_budget:
+      return True
+    elapsed = (time.perf_counter() - self.step_start) * 1000
+    overdue = game_time - self.next_run.get(module, game_time)
+    return elapsed + module.budget <= self.step_budget or overdue >= max(module.interval, 1)
+
+  def ran(self, module, game_time, requests):
+    if module.interval:
+      self.next_run[module] = game_time + module.interval
+    elif module.budget is not None:
+      # due every step, but when it last ran tells how long it has been put off
+      self.next_run[module] = game_time
+    self.requests[module] = requests
+
+  def skipped(self, module, game_time):
+    if not self.due(module, game_time):
+      return []
+    if module.budget is not None and module not in self.next_run:
+      self.next_run[module] = game_time
+    return self.requests.get(module, [])
@@ -84,13 +84,14 @@ class DetectCheeseMission(ScoutingMission):
     # if the situation is anything other than a single base in the main,
     # this *might* be hit once but that scout is going home soon
     base = self.enemy_structures(BaseStructures).first
+    ground_distances = self.shared.ground_distances
     def distance_to_enemy(ramp):
-      return ramp.top_center.distance_to(base)
+      return ground_distances.distance(base.position, ramp.top_center)
 
     # TODO: figure out ramp better
     likely_main_ramp = min(self.game_info.map_ramps, key=distance_to_enemy)
     def distance_to_ramp(base):
-      return base.distance_to(likely_main_ramp.bottom_center)
+      return ground_distances.distance(base, likely_main_ramp.bottom_center)
 
     possible_naturals = [ position for position in self.expansion_locations_dict.keys() if position.is_further_than(1.0, base.position) ]
     likely_natural = min(possible_naturals, key=distance_to_ramp)
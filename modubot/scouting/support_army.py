@@ -1,12 +1,11 @@
 from sc2.constants import UnitTypeId
 
-from modubot.common import is_worker
 from modubot.scouting.mission import ScoutingMission, identity
 
 class SupportArmyMission(ScoutingMission):
   def __init__(self, bot, unit_priority=[], retreat_while=lambda scout: False, start_when=None):
     if not start_when:
-      start_when = lambda: self.units.filter(lambda u: not is_worker(u)).exists
+      start_when = lambda: self.shared.views.army.exists
 
     super().__init__(bot, unit_priority, retreat_while)
     self.static_targets = False
@@ -1,6 +1,5 @@
 from sc2.constants import UnitTypeId
 from sc2.position import Point2
-from sc2.units import Units
 
 from modubot.common import BaseStructures
 from modubot.scouting.mission import ScoutingMission, identity
@@ -16,14 +15,14 @@ class WatchEnemyArmyMission(ScoutingMission):
   def generate_targets(self):
     # what combat units do we know about?
     is_combat_unit = lambda e: (e.type_id not in (UnitTypeId.PROBE, UnitTypeId.DRONE, UnitTypeId.SCV))
-    known_enemy_units = Units(self.shared.known_enemy_units.values(), self.bot).filter(is_combat_unit)
+    known_enemies = [ r for r in self.shared.known_enemies if is_combat_unit(r) ]
     seen_enemy_units = self.enemy_units.filter(is_combat_unit)
 
-    if seen_enemy_units.amount > known_enemy_units.amount / 5:
+    if seen_enemy_units.amount > len(known_enemies) / 5:
       self.is_lost = False
 
-    if known_enemy_units.exists:
-      enemies_center = known_enemy_units.center
+    if known_enemies:
+      enemies_center = Point2.center([ r.position for r in known_enemies ])
       if self.unit:
         scout = self.unit
         if scout.position.distance_to(enemies_center) < 5 and self.enemy_units.closer_than(10, scout.position).empty:
@@ -0,0 +1,87 @@
+import itertools
+
+import numpy as np
+
+from sc2.units import Units
+
+from modubot.common import is_worker, supply_cost
+from modubot.spatial import position_tuple
+
+_COLUMNS = {
+  'tag': (np.uint64, lambda u: u.tag),
+  'type': (np.int32, lambda u: u.type_id.value),
+  'x': (float, lambda u: u.position_tuple[0]),
+  'y': (float, lambda u: u.position_tuple[1]),
+  'hp': (float, lambda u: u.health),
+  'shield': (float, lambda u: u.shield),
+  'dps': (float, lambda u: u.ground_dps),
+  'air_dps': (float, lambda u: u.air_dps),
+  'range': (float, lambda u: u.ground_range),
+  'cooldown': (float, lambda u: u.weapon_cooldown),
+  'owner': (np.int32, lambda u: u.owner_id),
+  'supply': (float, supply_cost),
+  # flags
+  'ready': (bool, lambda u: u.is_ready),
+  'active': (bool, lambda u: u.is_active),
+  'idle': (bool, lambda u: u.is_idle),
+  'flying': (bool, lambda u: u.is_flying),
+  'massive': (bool, lambda u: u.is_massive),
+  'worker': (bool, is_worker),
+}
+
+_COLLECTIONS = {
+  'units': lambda bot: bot.units,
+  'structures': lambda bot: bot.structures,
+  'own': lambda bot: itertools.chain(bot.units, bot.structures),
+  'enemy_units': lambda bot: bot.enemy_units,
+  'enemy_structures': lambda bot: bot.enemy_structures,
+  'enemies': lambda bot: itertools.chain(bot.enemy_units, bot.enemy_structures),
+}
+
+# One collection of units as numpy columns, in the collection's order.
+# Each column is read from the units the first time it's asked for, so the units' properties are read once per step
+# however many loops go over them; masks built from the columns turn back into Units with `select`.
+class UnitColumns():
+  def __init__(self, units, bot):
+    self.bot = bot
+    self.units = list(units)
+
+  def __len__(self):
+    return len(self.units)
+
+  def __getattr__(self, name):
+    if name not in _COLUMNS:
+      raise AttributeError(name)
+    (dtype, read) = _COLUMNS[name]
+    column = np.fromiter((read(u) for u in self.units), dtype=dtype, count=len(self.units))
+    setattr(self, name, column)
+    return column
+
+  def of_type(self, types):
+    # a mask, for one UnitTypeId or a collection of them
+    values = [ types.value ] if hasattr(types, 'value') else [ t.value for t in types ]
+    return np.isin(self.type, values)
+
+  def select(self, mask):
+    return Units([ self.units[i] for i in np.flatnonzero(mask) ], self.bot)
+
+  def closest_to(self, position):
+    if not self.units:
+      return None
+    (x, y) = position_tuple(position)
+    offsets_x = self.x - x
+    offsets_y = self.y - y
+    return self.units[int(np.argmin(offsets_x * offsets_x + offsets_y * offsets_y))]
+
+# Per-step columns shared by all modules through `bot.shared.snapshot`.
+# Each collection is set up the first time it is asked for during the step.
+class UnitSnapshot():
+  def __init__(self, bot):
+    self.bot = bot
+
+  def __getattr__(self, name):
+    if name not in _COLLECTIONS:
+      raise AttributeError(name)
+    columns = UnitColumns(_COLLECTIONS[name](self.bot), self.bot)
+    setattr(self, name, columns)
+    return columns
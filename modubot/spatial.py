@@ -0,0 +1,92 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+from sc2.unit import Unit
+from sc2.units import Units
+
+def position_tuple(position):
+  return position.position_tuple if isinstance(position, Unit) else (position[0], position[1])
+
+# A KD-tree over a single Units collection.
+# Queries answer the same questions as the matching Units methods (including strict "closer than"),
+# and results keep the order of the original collection so `.first`, `.random` etc. behave the same.
+class UnitIndex():
+  def __init__(self, units, bot):
+    self.bot = bot
+    self.units = list(units)
+    self.positions = np.array([ u.position_tuple for u in self.units ]).reshape(-1, 2)
+    self.tree = cKDTree(self.positions) if self.units else None
+
+  def __len__(self):
+    return len(self.units)
+
+  def _subgroup(self, indices):
+    return Units([ self.units[i] for i in sorted(indices) ], self.bot)
+
+  def _indices_closer_than(self, distance, point):
+    # the tree includes points at exactly `distance`, Units.closer_than does not
+    candidates = self.tree.query_ball_point(point, distance)
+    if not candidates:
+      return []
+    offsets = self.positions[candidates] - point
+    inside = (offsets * offsets).sum(axis=1) < distance * distance
+    return [ i for (i, keep) in zip(candidates, inside) if keep ]
+
+  def closer_than(self, distance, position):
+    if not self.tree:
+      return Units([], self.bot)
+    return self._subgroup(self._indices_closer_than(distance, position_tuple(position)))
+
+  def closer_than_any(self, distance, positions):
+    # units within `distance` of at least one of `positions`, each returned once
+    if not self.tree:
+      return Units([], self.bot)
+    indices = set()
+    for position in positions:
+      indices.update(self._indices_closer_than(distance, position_tuple(position)))
+    return self._subgroup(indices)
+
+  def further_than(self, distance, position):
+    if not self.tree:
+      return Units([], self.bot)
+    not_further = set(self.tree.query_ball_point(position_tuple(position), distance))
+    return self._subgroup(i for i in range(len(self.units)) if i not in not_further)
+
+  def closest_to(self, position):
+    if not self.tree:
+      return None
+    _, i = self.tree.query(position_tuple(position))
+    return self.units[i]
+
+  def closest_n_units(self, position, n):
+    # sorted by distance, like Units.closest_n_units
+    if not self.tree or n < 1:
+      return Units([], self.bot)
+    k = min(n, len(self.units))
+    _, indices = self.tree.query(position_tuple(position), k=k)
+    indices = [ indices ] if k == 1 else indices
+    return Units([ self.units[i] for i in indices ], self.bot)
+
+_COLLECTIONS = {
+  'units',
+  'structures',
+  'townhalls',
+  'enemy_units',
+  'enemy_structures',
+  'mineral_field',
+  'vespene_geyser',
+  'destructables',
+}
+
+# Per-step spatial lookups shared by all modules through `bot.shared.spatial`.
+# Each collection is indexed the first time it is queried during the step.
+class SpatialIndex():
+  def __init__(self, bot):
+    self.bot = bot
+
+  def __getattr__(self, name):
+    if name not in _COLLECTIONS:
+      raise AttributeError(name)
+    index = UnitIndex(getattr(self.bot, name), self.bot)
+    setattr(self, name, index)
+    return index
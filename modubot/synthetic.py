@@ -0,0 +1,294 @@
+import random
+import struct
+
+import numpy as np
+
+from s2clientprotocol import common_pb2 as common_pb
+from s2clientprotocol import data_pb2 as data_pb
+from s2clientprotocol import raw_pb2 as raw_pb
+from s2clientprotocol import sc2api_pb2 as sc_pb
+
+from sc2 import Race
+from sc2.constants import UnitTypeId, AbilityId, UpgradeId
+from sc2.data import race_townhalls, race_worker
+from sc2.dicts.unit_research_abilities import RESEARCH_INFO
+from sc2.dicts.unit_train_build_abilities import TRAIN_INFO
+
+from modubot.recording import PLAYER, PING, DATA, GAME_INFO, OBSERVATION, Recording
+
+# Made-up games of any size, to see how step time grows with the number of units.
+#
+# A SyntheticGame produces the same entries a recording would: game data, a map, and a series of observations
+# of `army` own combat units and `enemies` enemy units around `bases` bases per side, milling about a little
+# from one frame to the next. Replay them with modubot.headless to run real modules against them.
+# Costs and stats are rough; only the shape of the game (how many of everything, and where) is meant to be realistic.
+
+MAP_SIZE = 176
+BASE_SPACING = 32
+GAME_LOOPS_PER_FRAME = 8
+
+# minerals, vespene, supply, health, shield, ground range, ground damage
+UNIT_STATS = {
+  UnitTypeId.PROBE:         ( 50,   0,   1,   20,   20, 0.1,  5),
+  UnitTypeId.DRONE:         ( 50,   0,   1,   40,    0, 0.1,  5),
+  UnitTypeId.SCV:           ( 50,   0,   1,   45,    0, 0.1,  5),
+  UnitTypeId.ZEALOT:        (100,   0,   2,  100,   50, 0.1, 16),
+  UnitTypeId.STALKER:       (125,  50,   2,   80,   80,   6, 13),
+  UnitTypeId.SENTRY:        ( 50, 100,   2,   40,   40,   5,  6),
+  UnitTypeId.ZERGLING:      ( 25,   0, 0.5,   35,    0, 0.1,  5),
+  UnitTypeId.ROACH:         ( 75,  25,   2,  145,    0,   4, 16),
+  UnitTypeId.HYDRALISK:     (100,  50,   2,   90,    0,   5, 12),
+  UnitTypeId.QUEEN:         (150,   0,   2,  175,    0,   5,  8),
+  UnitTypeId.MARINE:        ( 50,   0,   1,   45,    0,   5,  6),
+  UnitTypeId.MARAUDER:      (100,  25,   2,  125,    0,   6, 10),
+  UnitTypeId.NEXUS:         (400,   0,   0, 1000, 1000,   0,  0),
+  UnitTypeId.HATCHERY:      (300,   0,   0, 1500,    0,   0,  0),
+  UnitTypeId.COMMANDCENTER: (400,   0,   0, 1500,    0,   0,  0),
+  UnitTypeId.LARVA:         (  0,   0,   0,   10,    0,   0,  0),
+}
+DEFAULT_STATS = (100, 0, 2, 100, 0, 0, 0)
+
+ARMY_TYPES = {
+  Race.Protoss: [ UnitTypeId.ZEALOT, UnitTypeId.STALKER, UnitTypeId.STALKER, UnitTypeId.SENTRY ],
+  Race.Zerg: [ UnitTypeId.ZERGLING, UnitTypeId.ZERGLING, UnitTypeId.ROACH, UnitTypeId.HYDRALISK, UnitTypeId.QUEEN ],
+  Race.Terran: [ UnitTypeId.MARINE, UnitTypeId.MARINE, UnitTypeId.MARAUDER ],
+}
+
+SMALL_FOOTPRINT = {
+  UnitTypeId.PYLON, UnitTypeId.SUPPLYDEPOT, UnitTypeId.PHOTONCANNON, UnitTypeId.SHIELDBATTERY,
+  UnitTypeId.SPINECRAWLER, UnitTypeId.SPORECRAWLER, UnitTypeId.MISSILETURRET, UnitTypeId.CREEPTUMOR,
+  UnitTypeId.CREEPTUMORQUEEN, UnitTypeId.CREEPTUMORBURROWED,
+}
+RESOURCES = { UnitTypeId.MINERALFIELD, UnitTypeId.VESPENEGEYSER }
+TOWNHALLS = set.union(*race_townhalls.values())
+TOWNHALL = { Race.Protoss: UnitTypeId.NEXUS, Race.Zerg: UnitTypeId.HATCHERY, Race.Terran: UnitTypeId.COMMANDCENTER }
+
+def structure_types():
+  built_by_workers = [ set(TRAIN_INFO.get(worker, {})) for worker in race_worker.values() ]
+  return set.union(*built_by_workers, TOWNHALLS, RESOURCES, {
+    UnitTypeId.WARPGATE, UnitTypeId.GREATERSPIRE, UnitTypeId.CREEPTUMOR, UnitTypeId.CREEPTUMORQUEEN, UnitTypeId.CREEPTUMORBURROWED
+  })
+
+def unit_races():
+  # everything a race's worker or townhall leads to belongs to that race
+  races = dict()
+  for (race, worker) in race_worker.items():
+    for unit_type in race_townhalls[race] | { worker }:
+      races[unit_type] = race
+  changed = True
+  while changed:
+    changed = False
+    for (builder, trained) in TRAIN_INFO.items():
+      for unit_type in trained:
+        if builder in races and unit_type not in races:
+          races[unit_type] = races[builder]
+          changed = True
+  return races
+
+def game_data():
+  creation = { unit_type: info['ability'] for trained in TRAIN_INFO.values() for (unit_type, info) in trained.items() }
+  research = { upgrade: info['ability'] for upgrades in RESEARCH_INFO.values() for (upgrade, info) in upgrades.items() }
+  structures = structure_types()
+  races = unit_races()
+  footprints = { creation[s]: 1.0 if s in SMALL_FOOTPRINT else 2.5 if s in TOWNHALLS else 1.5
+    for s in structures if s in creation }
+
+  data = sc_pb.ResponseData()
+  for ability in AbilityId:
+    ability_data = data.abilities.add(ability_id=ability.value, link_name=ability.name, button_name=ability.name,
+      friendly_name=ability.name, available=True)
+    if ability in footprints:
+      ability_data.is_building = True
+      ability_data.footprint_radius = footprints[ability]
+
+  for unit_type in UnitTypeId:
+    if unit_type == UnitTypeId.NOTAUNIT:
+      continue
+    (minerals, vespene, supply, _, _, ground_range, damage) = UNIT_STATS.get(unit_type, DEFAULT_STATS)
+    is_structure = unit_type in structures
+    unit_data = data.units.add(unit_id=unit_type.value, name=unit_type.name, available=True,
+      mineral_cost=minerals, vespene_cost=vespene, food_required=0 if is_structure else supply,
+      race=races.get(unit_type, Race.NoRace).value, build_time=400, sight_range=9,
+      movement_speed=0 if is_structure else 3)
+    if unit_type in creation:
+      unit_data.ability_id = creation[unit_type].value
+    if is_structure:
+      unit_data.attributes.append(data_pb.Structure)
+    if damage:
+      unit_data.weapons.add(type=data_pb.Weapon.Ground, damage=damage, attacks=1, range=ground_range, speed=1.5)
+    if unit_type in TOWNHALLS:
+      unit_data.food_provided = 15
+    elif unit_type in { UnitTypeId.PYLON, UnitTypeId.SUPPLYDEPOT, UnitTypeId.OVERLORD }:
+      unit_data.food_provided = 8
+
+  for upgrade in UpgradeId:
+    upgrade_data = data.upgrades.add(upgrade_id=upgrade.value, name=upgrade.name, mineral_cost=100, vespene_cost=100, research_time=1000)
+    if upgrade in research:
+      upgrade_data.ability_id = research[upgrade].value
+
+  return data
+
+def image(size, bits_per_pixel, data):
+  grid = common_pb.ImageData(bits_per_pixel=bits_per_pixel, data=data)
+  grid.size.x = size
+  grid.size.y = size
+  return grid
+
+class SyntheticGame():
+  def __init__(self, race=Race.Protoss, army=20, enemies=20, bases=2, enemy_race=Race.Terran, seed=0):
+    self.race = race
+    self.enemy_race = enemy_race
+    self.rng = random.Random(seed)
+    self.next_tag = 1
+    self.structures = structure_types()
+
+    spots = [ (20.5 + BASE_SPACING * i, 20.5 + BASE_SPACING * j) for i in range(5) for j in range(5) ]
+    (own_main, enemy_main) = (spots[0], spots[-1])
+    self.own_bases = sorted(spots, key=lambda s: np.hypot(s[0] - own_main[0], s[1] - own_main[1]))[:bases]
+    self.enemy_bases = [ s for s in sorted(spots, key=lambda s: np.hypot(s[0] - enemy_main[0], s[1] - enemy_main[1]))
+      if s not in self.own_bases ][:bases]
+
+    # (type, position, tag, extra unit fields)
+    self.neutral = []
+    self.mineral_tags = dict()   # base -> mineral field tags
+    for base in spots:
+      self.mineral_tags[base] = []
+      for i in range(8):
+        tag = self.new_tag()
+        self.neutral.append((UnitTypeId.MINERALFIELD, (base[0] - 7 + i % 2, base[1] - 4 + i), tag, { "mineral_contents": 1500 }))
+        self.mineral_tags[base].append(tag)
+      for dy in (-3, 3):
+        self.neutral.append((UnitTypeId.VESPENEGEYSER, (base[0] + 7, base[1] + dy), self.new_tag(), { "vespene_contents": 2000 }))
+
+    self.own = []
+    self.enemy = []
+    for base in self.own_bases:
+      self.own.append([ TOWNHALL[race], base, self.new_tag(), { "assigned_harvesters": 16, "ideal_harvesters": 16 } ])
+      for i in range(16):
+        self.own.append([ race_worker[race], (base[0] - 4 + i % 3, base[1] - 3 + i // 3 * 1.5), self.new_tag(),
+          { "gather": self.mineral_tags[base][i % 8] } ])
+      if race == Race.Zerg:
+        for i in range(3):
+          self.own.append([ UnitTypeId.LARVA, (base[0] + i * 0.5, base[1] - 3), self.new_tag(), {} ])
+
+    for base in self.enemy_bases:
+      self.enemy.append([ TOWNHALL[enemy_race], base, self.new_tag(), {} ])
+      for i in range(8):
+        self.enemy.append([ race_worker[enemy_race], (base[0] - 4 + i % 3, base[1] - 3 + i // 3), self.new_tag(),
+          { "gather": self.mineral_tags[base][i] } ])
+
+    # the army gathers in front of the natural; half of the enemies come to meet it, the rest stay home
+    front = self.own_bases[min(1, len(self.own_bases) - 1)]
+    army_types = ARMY_TYPES[race]
+    for i in range(army):
+      self.own.append([ army_types[i % len(army_types)], self.scatter((front[0] + 10, front[1] + 10), 6), self.new_tag(), {} ])
+    enemy_types = ARMY_TYPES[enemy_race]
+    for i in range(enemies):
+      home = (front[0] + 18, front[1] + 18) if i % 2 == 0 else (enemy_main[0] - 10, enemy_main[1] - 10)
+      self.enemy.append([ enemy_types[i % len(enemy_types)], self.scatter(home, 6), self.new_tag(), {} ])
+
+    self.own_main = own_main
+    self.enemy_main = enemy_main
+
+  def new_tag(self):
+    self.next_tag += 1
+    return self.next_tag
+
+  def scatter(self, center, spread):
+    return (
+      min(max(center[0] + self.rng.gauss(0, spread), 2), MAP_SIZE - 2),
+      min(max(center[1] + self.rng.gauss(0, spread), 2), MAP_SIZE - 2),
+    )
+
+  def game_info(self):
+    height = np.full((MAP_SIZE, MAP_SIZE), 128, dtype=np.uint8)
+    placeable = np.ones((MAP_SIZE, MAP_SIZE), dtype=np.uint8)
+    # each main sits on a plateau with a two-wide ramp down towards the middle of the map
+    for (main, direction) in [ (self.own_main, 1), (self.enemy_main, -1) ]:
+      (x, y) = (int(main[0]), int(main[1]))
+      height[y - 14:y + 15, x - 14:x + 15] = 200
+      for i in range(6):
+        ramp_x = x + direction * (15 + i)
+        height[y:y + 2, ramp_x] = 190 - i * 10
+        placeable[y:y + 2, ramp_x] = 0
+
+    game_info = sc_pb.ResponseGameInfo(map_name="Synthetic", local_map_path="Synthetic.SC2Map")
+    game_info.player_info.add(player_id=1, type=sc_pb.Participant, race_requested=self.race.value, race_actual=self.race.value)
+    game_info.player_info.add(player_id=2, type=sc_pb.Computer, race_requested=self.enemy_race.value,
+      race_actual=self.enemy_race.value, difficulty=sc_pb.VeryHard, ai_build=sc_pb.Macro)
+    start_raw = game_info.start_raw
+    start_raw.map_size.x = MAP_SIZE
+    start_raw.map_size.y = MAP_SIZE
+    start_raw.pathing_grid.CopyFrom(image(MAP_SIZE, 1, bytes([ 0xFF ]) * (MAP_SIZE * MAP_SIZE // 8)))
+    start_raw.placement_grid.CopyFrom(image(MAP_SIZE, 1, np.packbits(placeable.flatten()).tobytes()))
+    start_raw.terrain_height.CopyFrom(image(MAP_SIZE, 8, height.tobytes()))
+    start_raw.playable_area.p1.x = MAP_SIZE
+    start_raw.playable_area.p1.y = MAP_SIZE
+    start_raw.start_locations.add(x=self.enemy_main[0], y=self.enemy_main[1])
+    return game_info
+
+  def add_unit(self, raw, unit_type, position, tag, alliance, owner, fields):
+    (_, _, _, health, shield, _, _) = UNIT_STATS.get(unit_type, DEFAULT_STATS)
+    unit = raw.units.add(display_type=raw_pb.Visible, alliance=alliance, tag=tag, unit_type=unit_type.value, owner=owner,
+      radius=2.75 if unit_type in TOWNHALLS else 0.5, build_progress=1.0,
+      health=health, health_max=health, shield=shield, shield_max=shield)
+    unit.pos.x = position[0]
+    unit.pos.y = position[1]
+    unit.pos.z = 10
+    for (field, value) in fields.items():
+      if field == "gather":
+        unit.orders.add(ability_id=AbilityId.HARVEST_GATHER.value, target_unit_tag=value)
+      else:
+        setattr(unit, field, value)
+
+  def observation(self, frame):
+    response = sc_pb.ResponseObservation()
+    observation = response.observation
+    observation.game_loop = frame * GAME_LOOPS_PER_FRAME
+
+    supply_used = sum(UNIT_STATS.get(u[0], DEFAULT_STATS)[2] for u in self.own if u[0] not in self.structures)
+    common = observation.player_common
+    common.player_id = 1
+    common.minerals = 400 + 25 * frame
+    common.vespene = 200 + 10 * frame
+    common.food_used = int(supply_used)
+    common.food_cap = min(200, int(supply_used) + 16)
+    common.food_workers = 16 * len(self.own_bases)
+
+    raw = observation.raw_data
+    raw.player.camera.x = self.own_main[0]
+    raw.player.camera.y = self.own_main[1]
+    raw.map_state.visibility.CopyFrom(image(MAP_SIZE, 8, bytes([ 2 ]) * (MAP_SIZE * MAP_SIZE)))
+    creep = np.zeros((MAP_SIZE, MAP_SIZE), dtype=np.uint8)
+    if self.race == Race.Zerg:
+      for (x, y) in self.own_bases:
+        creep[int(y) - 12:int(y) + 13, int(x) - 12:int(x) + 13] = 1
+    raw.map_state.creep.CopyFrom(image(MAP_SIZE, 1, np.packbits(creep.flatten()).tobytes()))
+
+    for (unit_type, position, tag, fields) in self.neutral:
+      self.add_unit(raw, unit_type, position, tag, raw_pb.Neutral, 16, fields)
+    # as in a real game, nothing of the enemy's is in sight on the first step
+    enemy = self.enemy if frame > 0 else []
+    for (units, alliance, owner) in [ (self.own, raw_pb.Self, 1), (enemy, raw_pb.Enemy, 2) ]:
+      for unit in units:
+        self.add_unit(raw, unit[0], unit[1], unit[2], alliance, owner, unit[3])
+    return response
+
+  def step(self):
+    # units that can move wander a little
+    for unit in self.own + self.enemy:
+      if UNIT_STATS.get(unit[0], DEFAULT_STATS)[5]:
+        unit[1] = self.scatter(unit[1], 0.5)
+
+  def entries(self, frames):
+    yield (PLAYER, struct.pack('<I', 1))
+    yield (PING, sc_pb.ResponsePing(game_version="synthetic", base_build=0).SerializeToString())
+    yield (DATA, game_data().SerializeToString())
+    for frame in range(frames):
+      yield (OBSERVATION, self.observation(frame).SerializeToString())
+      if frame == 0:
+        yield (GAME_INFO, self.game_info().SerializeToString())
+      self.step()
+
+  def recording(self, frames):
+    return Recording(self.entries(frames))
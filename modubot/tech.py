@@ -0,0 +1,84 @@
+import collections
+import functools
+
+from sc2.constants import UnitTypeId
+from sc2.dicts.unit_trained_from import UNIT_TRAINED_FROM
+from sc2.dicts.upgrade_researched_from import UPGRADE_RESEARCHED_FROM
+from sc2.dicts.unit_train_build_abilities import TRAIN_INFO
+from sc2.dicts.unit_research_abilities import RESEARCH_INFO
+
+_WORKERS = { UnitTypeId.SCV, UnitTypeId.PROBE, UnitTypeId.DRONE }
+
+# returned by TechTable.unmet when a dependency is on its way, and there's nothing to do but wait for it
+WAIT = object()
+
+def _required_building(info):
+  return info.get('required_building') if info else None
+
+@functools.lru_cache(maxsize=None)
+def requirements(expense):
+  # What an expense (a UnitTypeId or UpgradeId) needs before it can be made, in the order they're checked:
+  # a tuple of (types, type to build), where owning any one of the types meets the requirement.
+  # Workers aren't counted as a requirement: structures they build are planned elsewhere.
+  groups = []
+  if isinstance(expense, UnitTypeId):
+    creators = UNIT_TRAINED_FROM.get(expense, set())
+    required = next(filter(None, (_required_building(TRAIN_INFO.get(c, {}).get(expense)) for c in creators)), None)
+    if required:
+      groups.append((frozenset([ required ]), required))
+    if creators and not creators & _WORKERS:
+      # a warpgate can make what its gateway could, but it's the gateway that gets built
+      buildable = creators - { UnitTypeId.WARPGATE } or creators
+      groups.append((frozenset(creators), min(buildable, key=lambda t: t.value)))
+  elif expense in UPGRADE_RESEARCHED_FROM:
+    researcher = UPGRADE_RESEARCHED_FROM[expense]
+    required = _required_building(RESEARCH_INFO.get(researcher, {}).get(expense))
+    if required:
+      groups.append((frozenset([ required ]), required))
+    groups.append((frozenset([ researcher ]), researcher))
+  return tuple(groups)
+
+# What we own of each type this step, shared through `bot.shared.tech`, and what that leaves unmet in the tech tree.
+# Counts come from the snapshot, pending counts from already_pending, each worked out once per type per step.
+class TechTable():
+  def __init__(self, bot):
+    self.bot = bot
+    self.pending_counts = dict()
+    self.unmet_cache = dict()
+
+  def __getattr__(self, name):
+    if name not in ('owned_counts', 'ready_counts'):
+      raise AttributeError(name)
+    own = self.bot.shared.snapshot.own
+    self.owned_counts = collections.Counter(own.type.tolist())
+    self.ready_counts = collections.Counter(own.type[own.ready].tolist())
+    return getattr(self, name)
+
+  def owned(self, types):
+    return sum(self.owned_counts[t.value] for t in types)
+
+  def ready(self, types):
+    return sum(self.ready_counts[t.value] for t in types)
+
+  def pending(self, types):
+    for t in types:
+      if t not in self.pending_counts:
+        self.pending_counts[t] = self.bot.already_pending(t)
+    return sum(self.pending_counts[t] for t in types)
+
+  def unmet(self, expense):
+    # The first thing to build on the way to `expense`, going down the tech tree as far as nothing is owned or on its way:
+    # None when every requirement is ready, WAIT when the next one is owned or pending but not ready yet.
+    if expense not in self.unmet_cache:
+      self.unmet_cache[expense] = WAIT  # in case the tree loops back on itself
+      self.unmet_cache[expense] = self.resolve(expense)
+    return self.unmet_cache[expense]
+
+  def resolve(self, expense):
+    for (types, build) in requirements(expense):
+      if self.ready(types):
+        continue
+      if self.owned(types) or self.pending(types):
+        return WAIT
+      return self.unmet(build) or build
+    return None
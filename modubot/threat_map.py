@@ -0,0 +1,122 @@
+import math
+
+import numpy as np
+
+from sc2.position import Point2
+
+from modubot.spatial import position_tuple
+
+# enemies that do less damage than this (workers, mostly) aren't counted as a threat
+_MINIMUM_DPS = 5
+
+# how much further than its range an enemy is counted as reaching
+_MARGIN = 1
+
+_DIRECTIONS = [ (math.cos(a), math.sin(a)) for a in np.arange(8) * math.pi / 4 ]
+
+# Where enemy fire lands, shared through `bot.shared.threat_map`.
+#
+# Two grids over the map at pathing resolution, one for threats to ground units and one for threats to air units.
+# Every enemy in sight (and every known structure) adds its dps to the cells it can reach: its range, its radius and
+# a margin. The value rises towards the enemy, up to twice its dps, so that stepping downhill leads out of range.
+# `update` only redoes enemies that have moved to another cell, appeared or disappeared since the last step.
+class ThreatMap():
+  def __init__(self, game_info):
+    self.shape = game_info.pathing_grid.data_numpy.shape
+    self.pathable = game_info.pathing_grid.data_numpy == 1
+    self.ground = np.zeros(self.shape)
+    self.air = np.zeros(self.shape)
+    self.stamps = dict()        # tag -> (cell, type id), as last added to the grids
+    self.type_reach = dict()    # type id -> [ (grid, dps, kernel) ]
+    self.kernels = dict()       # radius -> kernel
+
+  def reach(self, unit):
+    reach = self.type_reach.get(unit.type_id)
+    if reach is None:
+      reach = self.type_reach[unit.type_id] = [
+        (grid, dps, self.kernel(weapon_range + unit.radius + _MARGIN))
+        for (grid, dps, weapon_range) in [ (self.ground, unit.ground_dps, unit.ground_range), (self.air, unit.air_dps, unit.air_range) ]
+        if dps >= _MINIMUM_DPS
+      ]
+    return reach
+
+  def kernel(self, radius):
+    radius = math.ceil(radius * 2) / 2
+    kernel = self.kernels.get(radius)
+    if kernel is None:
+      size = math.ceil(radius)
+      offsets = np.arange(-size, size + 1)
+      distances = np.hypot(offsets[np.newaxis, :], offsets[:, np.newaxis])
+      kernel = self.kernels[radius] = np.where(distances <= radius, 2 - distances / max(radius, 0.5), 0)
+    return kernel
+
+  def cell(self, point):
+    (x, y) = position_tuple(point)
+    return (min(max(int(y), 0), self.shape[0] - 1), min(max(int(x), 0), self.shape[1] - 1))
+
+  def stamp(self, cell, reach, sign):
+    (y, x) = cell
+    for (grid, dps, kernel) in reach:
+      size = kernel.shape[0] // 2
+      top, bottom = max(y - size, 0), min(y + size + 1, self.shape[0])
+      left, right = max(x - size, 0), min(x + size + 1, self.shape[1])
+      grid[top:bottom, left:right] += sign * dps * kernel[top - y + size:bottom - y + size, left - x + size:right - x + size]
+
+  def update(self, enemies):
+    seen = set()
+    for enemy in enemies:
+      seen.add(enemy.tag)
+      cell = self.cell(enemy.position_tuple)
+      stamp = self.stamps.get(enemy.tag)
+      if stamp == (cell, enemy.type_id):
+        continue
+      if stamp:
+        self.stamp(stamp[0], self.type_reach[stamp[1]], -1)
+      self.stamp(cell, self.reach(enemy), 1)
+      self.stamps[enemy.tag] = (cell, enemy.type_id)
+
+    for tag in self.stamps.keys() - seen:
+      (cell, type_id) = self.stamps.pop(tag)
+      self.stamp(cell, self.type_reach[type_id], -1)
+    if not self.stamps:
+      # start over, so that rounding errors don't pile up
+      self.ground[:] = 0
+      self.air[:] = 0
+
+  def grid(self, air):
+    return self.air if air else self.ground
+
+  def at(self, point, air=False):
+    return float(self.grid(air)[self.cell(point)])
+
+  def most_within(self, point, distance, air=False):
+    # the highest threat on any cell within `distance` of `point`
+    (y, x) = self.cell(point)
+    kernel = self.kernel(distance)
+    size = kernel.shape[0] // 2
+    top, bottom = max(y - size, 0), min(y + size + 1, self.shape[0])
+    left, right = max(x - size, 0), min(x + size + 1, self.shape[1])
+    inside = kernel[top - y + size:bottom - y + size, left - x + size:right - x + size] > 0
+    return float(self.grid(air)[top:bottom, left:right][inside].max())
+
+  def in_danger(self, point, distance=0, air=False):
+    # anything above half the smallest stamp, so leftovers from rounding don't count
+    return self.most_within(point, distance, air) > _MINIMUM_DPS / 2
+
+  def safe_step(self, unit, target, distance=4):
+    # a step downhill: of the points `distance` away from `unit` in each direction, the one with the least threat,
+    # or the one closest to `target` among those with equally little
+    grid = self.grid(unit.is_flying)
+    (x, y) = unit.position_tuple
+    (target_x, target_y) = position_tuple(target)
+    best = None
+    for (dx, dy) in _DIRECTIONS:
+      step = (x + dx * distance, y + dy * distance)
+      cell = self.cell(step)
+      if not unit.is_flying and not self.pathable[cell]:
+        continue
+      threat = grid[cell] if grid[cell] > _MINIMUM_DPS / 2 else 0
+      rank = (threat, math.hypot(target_x - step[0], target_y - step[1]))
+      if best is None or rank < best[0]:
+        best = (rank, step)
+    return Point2(best[1]) if best else target
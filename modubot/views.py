@@ -0,0 +1,32 @@
+from sc2.constants import UnitTypeId
+
+from modubot.common import is_worker
+
+_VIEWS = {
+  'army': lambda bot: bot.units.filter(lambda u: not is_worker(u)),
+  'ready_army': lambda bot: bot.units.ready.filter(lambda u: not is_worker(u)),
+  'ready_townhalls': lambda bot: bot.townhalls.ready,
+  'gas_buildings': lambda bot: bot.structures(bot.shared.gas_structure),
+  'queens': lambda bot: bot.units(UnitTypeId.QUEEN),
+}
+
+# Collections many modules derive from the game state, shared through `bot.shared.views`.
+# Each one is built the first time it is asked for during a step, and everyone else gets the same Units.
+# They're only good for the step they were built in: narrow them down with `filter` etc., never change them in place.
+class UnitViews():
+  def __init__(self, bot):
+    self.bot = bot
+    self.game_loop = None
+    self.views = dict()
+
+  def __getattr__(self, name):
+    if name not in _VIEWS:
+      raise AttributeError(name)
+    # events are handled before on_step, so a new step is noticed here rather than when on_step starts
+    if self.game_loop != self.bot.state.game_loop:
+      self.game_loop = self.bot.state.game_loop
+      self.views = dict()
+    view = self.views.get(name)
+    if view is None:
+      view = self.views[name] = _VIEWS[name](self.bot)
+    return view
@@ -107,6 +107,7 @@ def build():
             retreat_while=shield_is_not_full)
         ]),
       SimpleArmyBuilder(bot, get_priorities=army_priority(bot)),
+      UnitBreakdownLogger(bot),
       Upgrader(bot,
         upgrade_sets={
           Urgency.HIGH: [
@@ -0,0 +1,61 @@
+import asyncio
+import random
+import sys
+
+import numpy as np
+
+from sc2 import Race
+
+from modubot.headless import replay
+from modubot.profiler import StepProfiler
+from modubot.synthetic import SyntheticGame
+from protoss_greedy import build as build_protoss
+from zerg_experimental import build as build_zerg
+
+# Runs each bot against synthetic games of increasing size and reports how the median step time
+# of every module (and objective, planner, ...) grows with the number of units.
+#
+#   python scaling.py [protoss|zerg] [sizes...]
+#
+# At each size there are that many own army units and that many enemies, with a base per side for every 50.
+# "growth" is the slope of log(time) against log(size): about 1 means linear, about 2 means quadratic.
+
+builds = {
+  Race.Protoss: build_protoss,
+  Race.Zerg: build_zerg,
+}
+
+FRAMES = 40
+
+def step_times(race, size):
+  random.seed(0)
+  game = SyntheticGame(race=race, army=size, enemies=size, bases=1 + size // 50)
+  bot = builds[race]()
+  bot.profiler = StepProfiler(report_every=None)
+  asyncio.get_event_loop().run_until_complete(replay(bot, game.recording(FRAMES)))
+  return { f"{t['category']}:{t['name']}": t['wall']['p50_ms'] for t in bot.profiler.summaries() }
+
+def growth(sizes, times):
+  measured = [ (s, t) for (s, t) in zip(sizes, times) if t ]
+  if len(measured) < 2:
+    return None
+  (x, y) = np.log(np.array(measured)).T
+  return np.polyfit(x, y, 1)[0]
+
+def main():
+  races = [ Race[sys.argv[1].capitalize()] ] if len(sys.argv) > 1 else list(builds)
+  sizes = [ int(s) for s in sys.argv[2:] ] or [ 25, 50, 100, 200 ]
+
+  for race in races:
+    results = [ step_times(race, size) for size in sizes ]
+    sections = sorted(set().union(*results))
+    print(f"\n{race.name}: median ms per call")
+    print(f"{'section':<40}" + ''.join(f"{size:>10}" for size in sizes) + f"{'growth':>10}")
+    for section in sections:
+      times = [ result.get(section) for result in results ]
+      slope = growth(sizes, times)
+      print(f"{section:<40}" + ''.join(f"{t if t is not None else '-':>10}" for t in times)
+        + (f"{slope:>10.2f}" if slope is not None else f"{'-':>10}"))
+
+if __name__ == '__main__':
+  main()
@@ -108,6 +108,7 @@ def build():
           SupportArmyMission(bot, unit_priority=[ UnitTypeId.OVERSEER ])
         ]),
       SimpleArmyBuilder(bot, get_priorities=army_priority(bot)),
+      UnitBreakdownLogger(bot),
       Upgrader(bot,
         upgrade_sets={
           Urgency.MEDIUMHIGH: [